@@ -1,8 +1,9 @@
 from collections.abc import AsyncGenerator
+from ipaddress import ip_address
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
@@ -10,9 +11,12 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
+from app.core.tokens import get_token_state
 from app.db.session import async_engine
 from app.models.user import User
+from app.repositories.user import UserRepository
 from app.schemas.auth import TokenPayload
+from app.schemas.user import UserPublic
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -28,18 +32,78 @@ TokenDep = Annotated[str, Depends(reusable_oauth2)]
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 
 
-async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ip_address(host.strip())
+    except ValueError:
+        return False
+    return any(address in network for network in settings.TRUSTED_PROXIES)
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    IP клиента с учетом прокси из TRUSTED_PROXIES.
+
+    X-Forwarded-For разбирается справа налево: адреса доверенных прокси
+    пропускаются, первый остальной считается клиентом. Заголовок от
+    недоверенного соединения игнорируется, чтобы клиент не мог подменить IP.
+    """
+    host = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(host):
+        return host
+    forwarded = [
+        address.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded):
+        if not is_trusted_proxy(address):
+            return address
+    return forwarded[0] if forwarded else host
+
+
+ClientIpDep = Annotated[str, Depends(get_client_ip)]
+
+
+def decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = await session.get(User, token_data.sub)
+
+
+async def authenticate_token(token: str) -> tuple[TokenPayload, bool]:
+    """
+    Проверяет access токен и список отозванных токенов.
+
+    Возвращает данные токена и признак того, что версия пользователя
+    в токене актуальна.
+    """
+    token_data = decode_token(token)
+    if token_data.type != "access" or token_data.sub is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    version, revoked = await get_token_state(token_data.sub, token_data.jti)
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Token has been revoked"
+        )
+    return token_data, token_data.ver == version
+
+
+async def get_user_from_db(session: AsyncSession, token_data: TokenPayload) -> User:
+    # Через репозиторий, чтобы волна запросов с одним токеном
+    # выполнила один запрос к базе
+    user = await UserRepository(session).get_by_id(str(token_data.sub))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -47,17 +111,48 @@ async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> U
     return user
 
 
+async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+    token_data, _ = await authenticate_token(token)
+    return await get_user_from_db(session, token_data)
+
+
 CurrentUserAsync = Annotated[User, Depends(get_current_user_async)]
 
 
-async def get_current_active_user(current_user: CurrentUserAsync) -> User:
+async def get_current_user_public(
+    session: AsyncSessionDep, token: TokenDep
+) -> UserPublic:
+    """
+    Текущий пользователь из данных токена.
+
+    Если в токене есть актуальные (по версии в Redis) данные пользователя,
+    база не запрашивается, иначе пользователь читается из базы.
+    """
+    token_data, is_current = await authenticate_token(token)
+    if token_data.user is not None and is_current:
+        if not token_data.user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        return token_data.user
+    user = await get_user_from_db(session, token_data)
+    return UserPublic.model_validate(user)
+
+
+CurrentUserPublic = Annotated[UserPublic, Depends(get_current_user_public)]
+
+
+async def get_current_active_user(current_user: CurrentUserPublic) -> UserPublic:
     """Зависимость для получения текущего активного пользователя"""
     return current_user
 
 
-async def get_current_active_superuser(current_user: CurrentUserAsync) -> User:
+async def get_current_active_superuser(
+    current_user: CurrentUserPublic,
+) -> UserPublic:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+CurrentSuperuser = Annotated[UserPublic, Depends(get_current_active_superuser)]
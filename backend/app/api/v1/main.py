@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.api.v1.routes import (
+    files,
     login,
     private,
     users,
@@ -14,5 +15,6 @@ api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(websocket.router)
+api_router.include_router(files.router)
 if settings.ENVIRONMENT == "local":
     api_router.include_router(private.router)
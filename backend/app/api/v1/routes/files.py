@@ -0,0 +1,175 @@
+import hashlib
+import mimetypes
+import re
+import uuid
+from collections.abc import AsyncIterator
+from pathlib import PurePath
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Path, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.v1.deps import CurrentUserPublic
+from app.core.config import settings
+from app.schemas.file import StoredFilePublic
+from app.schemas.user import UserPublic
+from app.utils.multipart import stream_file_field
+from app.utils.storage import PARTIAL_SUFFIX, get_storage, parse_range_header
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+# Расширение исходного имени сохраняется, если оно безопасно для пути
+SUFFIX_PATTERN = r"\.[A-Za-z0-9]{1,16}"
+FileId = Annotated[str, Path(pattern=rf"^[0-9a-f]{{32}}({SUFFIX_PATTERN})?$")]
+# Запас на границы и заголовки частей multipart сверх размера файла
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def get_file_path(user: UserPublic, file_id: str) -> str:
+    return f"files/{user.id}/{file_id}"
+
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File is larger than {settings.UPLOAD_MAX_SIZE} bytes",
+    )
+
+
+@router.post(
+    "/",
+    status_code=201,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_file(
+    request: Request, current_user: CurrentUserPublic
+) -> StoredFilePublic:
+    """
+    Upload a file as multipart/form-data field "file".
+
+    The body is parsed as it arrives and the file is streamed into the
+    storage backend while its SHA-256 is computed, without a temporary
+    copy. Oversized requests are rejected as early as possible.
+    """
+    # Размер проверяется по заголовку до чтения тела запроса
+    max_body_size = settings.UPLOAD_MAX_SIZE + MULTIPART_OVERHEAD
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_body_size:
+        raise too_large()
+
+    async def read_body() -> AsyncIterator[bytes]:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            # Без Content-Length тело ограничивается по мере чтения
+            if received > max_body_size:
+                raise too_large()
+            yield chunk
+
+    content_type = request.headers.get("content-type", "")
+    try:
+        file = await stream_file_field(content_type, read_body(), "file")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if file is None:
+        raise HTTPException(status_code=422, detail="Field 'file' is required")
+
+    filename = PurePath(file.filename).name
+    suffix = PurePath(filename).suffix
+    # Имена временных файлов хранилища не должны совпадать с загруженными
+    if not re.fullmatch(SUFFIX_PATTERN, suffix) or suffix.lower() == PARTIAL_SUFFIX:
+        suffix = ""
+    file_id = f"{uuid.uuid4().hex}{suffix}"
+    digest = hashlib.sha256()
+    size = 0
+
+    async def read_chunks() -> AsyncIterator[bytes]:
+        nonlocal size
+        async for chunk in file.chunks:
+            size += len(chunk)
+            if size > settings.UPLOAD_MAX_SIZE:
+                raise too_large()
+            digest.update(chunk)
+            yield chunk
+
+    storage = get_storage()
+    try:
+        await storage.save_stream(read_chunks(), get_file_path(current_user, file_id))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StoredFilePublic(
+        id=file_id,
+        filename=filename,
+        content_type=file.content_type or "application/octet-stream",
+        size=size,
+        sha256=digest.hexdigest(),
+        url=f"{settings.API_V1_STR}/files/{file_id}",
+    )
+
+
+@router.get(
+    "/{file_id}",
+    response_class=StreamingResponse,
+    responses={206: {"description": "Partial content"}},
+)
+async def download_file(
+    file_id: FileId,
+    request: Request,
+    current_user: CurrentUserPublic,
+) -> StreamingResponse:
+    """
+    Download an uploaded file, a single byte range is supported via Range.
+    """
+    storage = get_storage()
+    file_path = get_file_path(current_user, file_id)
+    # Недописанные файлы хранилища не отдаются
+    if file_id.lower().endswith(PARTIAL_SUFFIX):
+        raise HTTPException(status_code=404, detail="File not found")
+    size = await storage.get_size(file_path)
+    if size is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{file_id}"',
+    }
+    media_type = mimetypes.guess_type(file_id)[0] or "application/octet-stream"
+    status_code = 200
+    start, end = 0, size - 1
+
+    range_header = request.headers.get("range")
+    if range_header:
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except ValueError:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.iter_range(file_path, start, end) if size else iter(()),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
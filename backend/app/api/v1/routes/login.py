@@ -7,16 +7,37 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.v1.deps import (
     AsyncSessionDep,
-    CurrentUserAsync,
+    ClientIpDep,
+    CurrentUserPublic,
+    TokenDep,
+    authenticate_token,
+    decode_token,
     get_current_active_superuser,
 )
 from app.core.config import settings
-from app.core.security import create_access_token
+from app.core.rate_limit import (
+    Backoff,
+    RateLimit,
+    acquire_once,
+    enforce,
+    get_lockout,
+    register_failure,
+    release_once,
+    reset_failures,
+)
+from app.core.security import create_access_token, create_refresh_token
+from app.core.tokens import (
+    get_session_version,
+    get_token_version,
+    revoke_token,
+    revoke_user_sessions,
+)
+from app.models.user import User
 from app.repositories.user import UserRepository
-from app.schemas.auth import NewPassword, Token
+from app.schemas.auth import NewPassword, RefreshTokenRequest, Token
 from app.schemas.common import ApiMessage
 from app.schemas.user import UserPublic, UserUpdate
-from app.tasks.email import send_reset_password_email_task
+from app.tasks.email import dispatch_email, send_reset_password_email_task
 from app.utils.email import generate_reset_password_email
 from app.utils.security import (
     generate_password_reset_token,
@@ -25,30 +46,146 @@ from app.utils.security import (
 
 router = APIRouter(tags=["login"])
 
+login_account_backoff = Backoff(
+    "login_account",
+    settings.LOGIN_ACCOUNT_FREE_ATTEMPTS,
+    settings.LOGIN_BACKOFF_BASE,
+    settings.LOGIN_BACKOFF_MAX,
+    settings.LOGIN_FAILURE_WINDOW,
+)
+login_ip_backoff = Backoff(
+    "login_ip",
+    settings.LOGIN_IP_FREE_ATTEMPTS,
+    settings.LOGIN_BACKOFF_BASE,
+    settings.LOGIN_BACKOFF_MAX,
+    settings.LOGIN_FAILURE_WINDOW,
+)
+recovery_email_limit = RateLimit(
+    "password_recovery_email",
+    settings.PASSWORD_RECOVERY_EMAIL_LIMIT,
+    settings.PASSWORD_RECOVERY_WINDOW,
+)
+recovery_ip_limit = RateLimit(
+    "password_recovery_ip",
+    settings.PASSWORD_RECOVERY_IP_LIMIT,
+    settings.PASSWORD_RECOVERY_WINDOW,
+)
+
+
+async def create_tokens(user: User) -> Token:
+    """Выдает короткоживущий access токен и refresh токен"""
+    version = await get_token_version(user.id)
+    session_version = await get_session_version(user.id)
+    claims = None
+    if settings.ACCESS_TOKEN_USER_CLAIMS:
+        claims = {
+            "user": UserPublic.model_validate(user).model_dump(mode="json"),
+            "ver": version,
+        }
+    return Token(
+        access_token=create_access_token(
+            user.id,
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            claims=claims,
+        ),
+        refresh_token=create_refresh_token(
+            user.id,
+            expires_delta=timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+            version=session_version,
+        ),
+    )
+
 
 @router.post("/login/access-token")
 async def login_access_token(
-    session: AsyncSessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+    client_ip: ClientIpDep,
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
+    # Блокировка проверяется до обращения к базе и проверки пароля, а
+    # неудачей попытка считается только после неверного пароля. Число
+    # одновременных проверок ограничено пулом password_hash_executor
+    checks = (
+        (login_account_backoff, form_data.username),
+        (login_ip_backoff, client_ip),
+    )
+    lockout = await get_lockout(*checks)
+    if lockout:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(lockout)},
+        )
+
     user = await UserRepository(session=session).authenticate(
         email=form_data.username, password=form_data.password
     )
     if not user:
+        await register_failure(*checks)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    elif not user.is_active:
+    await reset_failures(login_account_backoff, form_data.username)
+    if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    token = Token(
-        access_token=create_access_token(user.id, expires_delta=access_token_expires)
-    )
-    return token
+    return await create_tokens(user)
+
+
+@router.post("/login/refresh-token")
+async def refresh_access_token(
+    session: AsyncSessionDep, body: RefreshTokenRequest
+) -> Token:
+    """
+    Exchange a refresh token for a new token pair, the old one is revoked
+    """
+    token_data = decode_token(body.refresh_token)
+    if (
+        token_data.type != "refresh"
+        or token_data.jti is None
+        or token_data.exp is None
+        or token_data.sub is None
+    ):
+        raise HTTPException(status_code=403, detail="Could not validate credentials")
+    if not await revoke_token(token_data.jti, token_data.exp):
+        # Повторное использование уже обмененного токена - признак утечки,
+        # поэтому отзываем все refresh токены пользователя
+        await revoke_user_sessions(token_data.sub)
+        raise HTTPException(status_code=403, detail="Token has been revoked")
+    if token_data.ver != await get_session_version(token_data.sub):
+        raise HTTPException(status_code=403, detail="Token has been revoked")
+    user = await session.get(User, token_data.sub)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return await create_tokens(user)
+
+
+@router.post("/login/logout")
+async def logout(
+    token: TokenDep, body: RefreshTokenRequest | None = None
+) -> ApiMessage:
+    """
+    Revoke the access token and, if given, the refresh token
+    """
+    token_data, _ = await authenticate_token(token)
+    if token_data.jti and token_data.exp:
+        await revoke_token(token_data.jti, token_data.exp)
+    if body is not None:
+        refresh_data = decode_token(body.refresh_token)
+        if (
+            refresh_data.type == "refresh"
+            and refresh_data.sub == token_data.sub
+            and refresh_data.jti
+            and refresh_data.exp
+        ):
+            await revoke_token(refresh_data.jti, refresh_data.exp)
+    return ApiMessage(message="Logged out")
 
 
 @router.post("/login/test-token", response_model=UserPublic)
-def test_token(current_user: CurrentUserAsync) -> Any:
+async def test_token(current_user: CurrentUserPublic) -> Any:
     """
     Test access token
     """
@@ -56,23 +193,39 @@ def test_token(current_user: CurrentUserAsync) -> Any:
 
 
 @router.post("/password-recovery/{email}")
-async def recover_password(email: str, session: AsyncSessionDep) -> ApiMessage:
+async def recover_password(
+    email: str, client_ip: ClientIpDep, session: AsyncSessionDep
+) -> ApiMessage:
     """
     Password Recovery
     """
+    # Ограничения проверяются до обращения к базе и очереди писем
+    await enforce((recovery_email_limit, email), (recovery_ip_limit, client_ip))
+    # Письмо для этого email уже поставлено в очередь недавно
+    if not await acquire_once(
+        "password_recovery_sent", email, settings.PASSWORD_RECOVERY_DEDUP_SECONDS
+    ):
+        return ApiMessage(message="Password recovery email sent")
+
     user = await UserRepository(session=session).get_by_email(email=email)
 
     if not user:
+        await release_once("password_recovery_sent", email)
         raise HTTPException(
             status_code=404,
             detail="The user with this email does not exist in the system.",
         )
     password_reset_token = generate_password_reset_token(email=email)
-    send_reset_password_email_task.delay(
-        email_to=user.email,
-        email=email,
-        token=password_reset_token,
-    )
+    try:
+        await dispatch_email(
+            send_reset_password_email_task,
+            email_to=user.email,
+            email=email,
+            token=password_reset_token,
+        )
+    except Exception:
+        await release_once("password_recovery_sent", email)
+        raise
     return ApiMessage(message="Password recovery email sent")
 
 
@@ -94,6 +247,7 @@ async def reset_password(session: AsyncSessionDep, body: NewPassword) -> ApiMess
         raise HTTPException(status_code=400, detail="Inactive user")
     user_update = UserUpdate(password=body.new_password)
     await UserRepository(session=session).update(db_user=user, user=user_update)
+    await revoke_user_sessions(user.id)
     return ApiMessage(message="Password updated successfully")
 
 
@@ -4,7 +4,8 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 
 from app.api.v1.deps import AsyncSessionDep
-from app.core.security import get_password_hash
+from app.core.cache import invalidate
+from app.core.security import get_password_hash_async
 from app.models.user import User
 from app.schemas.user import UserPublic
 
@@ -27,10 +28,11 @@ async def create_user(user_in: PrivateUserCreate, session: AsyncSessionDep) -> A
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
     )
 
     session.add(user)
     await session.commit()
+    await invalidate("users")
 
     return user
@@ -1,47 +1,65 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from anyio import open_file
+from celery.result import AsyncResult
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.sql import func, select
 
 from app.api.v1.deps import (
     AsyncSessionDep,
+    CurrentSuperuser,
     CurrentUserAsync,
+    CurrentUserPublic,
     get_current_active_superuser,
 )
+from app.core.cache import cached, cached_value, invalidate
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
+from app.core.tokens import revoke_user_claims, revoke_user_sessions
 from app.models.user import User
 from app.repositories.user import UserRepository
 from app.schemas.common import ApiMessage
 from app.schemas.user import (
     UpdatePassword,
     UserCreate,
+    UserImportStatus,
     UserPublic,
     UserRegister,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils.email import generate_new_account_email, send_email
+from app.services.user_transfer import TransferFormat, export_users, get_import_dir
+from app.tasks.email import dispatch_email, send_new_account_email_task
+from app.tasks.users import import_users_task
+from app.utils.streaming import streaming_list_response
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.get(
-    "/",
-    dependencies=[Depends(get_current_active_superuser)],
-    response_model=UsersPublic,
-)
-async def read_users(session: AsyncSessionDep, skip: int = 0, limit: int = 100) -> Any:
+@router.get("/", response_model=UsersPublic)
+@cached("users", scope="role")
+async def read_users(
+    session: AsyncSessionDep, _: CurrentSuperuser, skip: int = 0, limit: int = 100
+) -> Any:
     """
     Retrieve users.
     """
-    users = await UserRepository(session).list(skip=skip, limit=limit)
-    count_statement = select(func.count()).select_from(User)
-    count = await session.scalar(count_statement)
-    users_list = [UserPublic.model_validate(user) for user in users]
-    return UsersPublic(data=users_list, count=count)
+
+    async def count_users() -> int:
+        count_statement = select(func.count()).select_from(User)
+        return await session.scalar(count_statement) or 0
+
+    count = await cached_value(
+        "users", "count", settings.USER_COUNT_CACHE_TTL, count_users
+    )
+    statement = UserRepository(session).list_columns_statement(
+        UserPublic, skip=skip, limit=limit
+    )
+    return streaming_list_response(statement, UserPublic, count)
 
 
 @router.post(
@@ -58,18 +76,84 @@ async def create_new_user(*, session: AsyncSessionDep, user_in: UserCreate) -> A
             detail="The user with this email already exists in the system.",
         )
     user = await UserRepository(session).create(user_in)
+    await invalidate("users")
     if settings.emails_enabled and user_in.email:
-        email_data = generate_new_account_email(
-            email_to=user_in.email, username=user_in.email, password=user_in.password
-        )
-        send_email(
+        await dispatch_email(
+            send_new_account_email_task,
             email_to=user_in.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
+            username=user_in.email,
+            password=user_in.password,
         )
     return user
 
 
+@router.post(
+    "/import",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=202,
+)
+async def import_users(request: Request, format: TransferFormat = "csv") -> Any:
+    """
+    Bulk import users from a CSV or NDJSON request body.
+
+    The body is streamed to disk and imported by a Celery task,
+    existing emails are skipped.
+    """
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Import file is larger than {settings.USER_IMPORT_MAX_SIZE} bytes",
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.USER_IMPORT_MAX_SIZE:
+        raise too_large
+
+    path = get_import_dir() / f"{uuid.uuid4()}.{format}"
+    try:
+        size = 0
+        async with await open_file(path, "wb") as file:
+            async for chunk in request.stream():
+                size += len(chunk)
+                # Без Content-Length размер проверяется по мере записи
+                if size > settings.USER_IMPORT_MAX_SIZE:
+                    raise too_large
+                await file.write(chunk)
+        # Постановка в очередь - сетевой вызов, он выполняется вне event loop
+        task = await run_in_threadpool(import_users_task.delay, str(path), format)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    # Только что поставленная задача еще не выполнялась, запрашивать ее
+    # состояние у хранилища результатов не нужно
+    return UserImportStatus(task_id=task.id, state="PENDING")
+
+
+@router.get(
+    "/import/{task_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserImportStatus,
+)
+def read_import_status(task_id: str) -> Any:
+    """
+    Get bulk import progress.
+    """
+    result = AsyncResult(task_id, app=import_users_task.app)
+    progress = result.info if isinstance(result.info, dict) else None
+    return UserImportStatus(task_id=task_id, state=result.state, progress=progress)
+
+
+@router.get("/export", dependencies=[Depends(get_current_active_superuser)])
+async def export_users_file(format: TransferFormat = "csv") -> StreamingResponse:
+    """
+    Stream all users as CSV or NDJSON.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_users(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
 @router.patch("/me", response_model=UserPublic)
 async def update_user_me(
     *, session: AsyncSessionDep, user_in: UserUpdateMe, current_user: CurrentUserAsync
@@ -88,6 +172,8 @@ async def update_user_me(
     session.add(current_user)
     await session.commit()
     await session.refresh(current_user)
+    await revoke_user_claims(current_user.id)
+    await invalidate("users")
     return current_user
 
 
@@ -98,21 +184,24 @@ async def update_password_me(
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    if not await verify_password_async(
+        body.current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
     await session.commit()
+    await revoke_user_sessions(current_user.id)
     return ApiMessage(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUserAsync) -> Any:
+async def read_user_me(current_user: CurrentUserPublic) -> Any:
     """
     Get current user.
     """
@@ -132,6 +221,8 @@ async def delete_user_me(
         )
     await session.delete(current_user)
     await session.commit()
+    await revoke_user_sessions(current_user.id)
+    await invalidate("users")
     return ApiMessage(message="User deleted successfully")
 
 
@@ -148,6 +239,7 @@ async def register_user(session: AsyncSessionDep, user_in: UserRegister) -> Any:
         )
     user_create = UserCreate.model_validate(user_in)
     user = await UserRepository(session).create(user_create)
+    await invalidate("users")
     return user
 
 
@@ -196,6 +288,13 @@ async def update_user_by_id(
                 status_code=409, detail="User with this email already exists"
             )
     user = await UserRepository(session).update(db_user, user_in)
+    # Смена пароля или деактивация завершает сессии, остальные изменения
+    # только обновляют данные в токенах
+    if user_in.password or not user.is_active:
+        await revoke_user_sessions(user_id)
+    else:
+        await revoke_user_claims(user_id)
+    await invalidate("users")
     return user
 
 
@@ -215,4 +314,6 @@ async def delete_user(
         )
     await session.delete(user)
     await session.commit()
+    await revoke_user_sessions(user_id)
+    await invalidate("users")
     return ApiMessage(message="User deleted successfully")
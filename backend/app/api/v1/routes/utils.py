@@ -1,9 +1,17 @@
+import os
+from datetime import UTC, datetime
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.v1.deps import get_current_active_superuser
+from app.core.celery_app import celery_app
+from app.core.celery_metrics import get_queue_depths, get_unacked_count
+from app.db.profiler import profiler
+from app.schemas.celery import CeleryQueue, CeleryQueuesPublic
 from app.schemas.common import ApiMessage
-from app.utils.email import generate_test_email, send_email
+from app.schemas.profiling import QueryProfile, QueryProfilesPublic
+from app.tasks.email import dispatch_email, send_test_email_task
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -13,19 +21,68 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> ApiMessage:
+async def test_email(email_to: EmailStr) -> ApiMessage:
     """
     Test emails.
     """
-    email_data = generate_test_email(email_to=email_to)
-    send_email(
-        email_to=email_to,
-        subject=email_data.subject,
-        html_content=email_data.html_content,
-    )
+    await dispatch_email(send_test_email_task, email_to=email_to)
     return ApiMessage(message="Test email sent")
 
 
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/sql-profile/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def read_sql_profile(limit: int = 50) -> QueryProfilesPublic:
+    """
+    Most expensive SQL query fingerprints of the current worker process.
+    """
+    return QueryProfilesPublic(
+        since=datetime.fromtimestamp(profiler.started_at, UTC),
+        pid=os.getpid(),
+        data=[
+            QueryProfile(
+                fingerprint=key,
+                count=stats.count,
+                total_ms=round(stats.total_seconds * 1000, 3),
+                mean_ms=round(stats.total_seconds / stats.count * 1000, 3),
+                max_ms=round(stats.max_seconds * 1000, 3),
+                slow_count=stats.slow_count,
+                n_plus_one_count=stats.n_plus_one_count,
+            )
+            for key, stats in profiler.snapshot(limit)
+        ],
+    )
+
+
+@router.delete(
+    "/sql-profile/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def reset_sql_profile() -> ApiMessage:
+    """
+    Reset SQL profile of the current worker process.
+    """
+    profiler.reset()
+    return ApiMessage(message="SQL profile reset")
+
+
+@router.get(
+    "/celery-queues/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def read_celery_queues() -> CeleryQueuesPublic:
+    """
+    Number of messages waiting in each Celery queue of the broker.
+    """
+    queues = [queue.name for queue in celery_app.conf.task_queues]
+    depths = await get_queue_depths(queues)
+    return CeleryQueuesPublic(
+        data=[CeleryQueue(name=name, messages=depths[name]) for name in queues],
+        unacked=await get_unacked_count(),
+    )
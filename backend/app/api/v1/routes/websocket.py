@@ -1,12 +1,14 @@
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from redis.asyncio import Redis
 
 from app.api.v1.deps import get_current_active_superuser, get_current_active_user
+from app.core.cache import cached
 from app.core.config import settings
-from app.models.user import User
+from app.core.metrics import InstrumentedRedis
+from app.schemas.user import UserPublic
 from app.websockets.handlers import broadcast_message as ws_broadcast_message
 from app.websockets.handlers import (
     get_all_active_sessions,
@@ -17,8 +19,10 @@ from app.websockets.handlers import (
     user_states,
 )
 
+# Данные из Redis уже состоят из JSON типов, поэтому ответы отдаются через
+# ORJSONResponse напрямую, минуя jsonable_encoder
 router = APIRouter(tags=["websocket"])
-redis = Redis.from_url(settings.REDIS_URL)
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
 
 
 class MessageData(BaseModel):
@@ -36,22 +40,24 @@ class BroadcastData(BaseModel):
 
 
 @router.get("/websocket/servers")
-async def get_websocket_servers(_: User = Depends(get_current_active_user)):
+@cached("websocket", scope="global")
+async def get_websocket_servers(_: UserPublic = Depends(get_current_active_user)):
     """Получить список доступных WebSocket серверов"""
     servers = await get_all_active_websocket_servers()
-    return {"servers": servers, "count": len(servers)}
+    return ORJSONResponse({"servers": servers, "count": len(servers)})
 
 
 @router.get("/websocket/sessions")
-async def get_websocket_sessions(_: User = Depends(get_current_active_superuser)):
+@cached("websocket", scope="role")
+async def get_websocket_sessions(_: UserPublic = Depends(get_current_active_superuser)):
     """Получить информацию о всех активных WebSocket сессиях"""
     sessions = await get_all_active_sessions()
-    return {"sessions": sessions, "count": len(sessions)}
+    return ORJSONResponse({"sessions": sessions, "count": len(sessions)})
 
 
 @router.get("/websocket/sessions/{client_id}")
 async def get_client_session(
-    client_id: str, _: User = Depends(get_current_active_user)
+    client_id: str, _: UserPublic = Depends(get_current_active_user)
 ):
     """Получить информацию о конкретной WebSocket сессии"""
     session = await get_session_by_client_id(client_id)
@@ -63,12 +69,14 @@ async def get_client_session(
     # Добавляем статус пользователя, если он есть
     session["user_state"] = user_states.get(client_id)
 
-    return session
+    return ORJSONResponse(session)
 
 
 @router.post("/websocket/send/{client_id}")
 async def send_message(
-    client_id: str, message: MessageData, user: User = Depends(get_current_active_user)
+    client_id: str,
+    message: MessageData,
+    user: UserPublic = Depends(get_current_active_user),
 ):
     """Отправить сообщение конкретному клиенту"""
     session = await get_session_by_client_id(client_id)
@@ -101,7 +109,7 @@ async def send_message(
 
 @router.post("/websocket/broadcast")
 async def broadcast_message(
-    data: BroadcastData, user: User = Depends(get_current_active_user)
+    data: BroadcastData, user: UserPublic = Depends(get_current_active_user)
 ):
     """Отправить сообщение всем подключенным клиентам"""
     success = await ws_broadcast_message(
@@ -109,7 +117,7 @@ async def broadcast_message(
             "type": data.message.type,
             "content": data.message.content,
             "sender": {
-                "id": user.id,
+                "id": str(user.id),
                 "email": user.email,
                 "is_superuser": user.is_superuser,
             },
@@ -127,13 +135,14 @@ async def broadcast_message(
 
 
 @router.get("/websocket/servers/status")
-async def get_servers_status(_: User = Depends(get_current_active_superuser)):
+@cached("websocket", scope="role")
+async def get_servers_status(_: UserPublic = Depends(get_current_active_superuser)):
     """Получить статус всех WebSocket серверов с активными соединениями"""
     status_data = await get_websocket_servers_status()
-    return {"status": status_data}
+    return ORJSONResponse({"status": status_data})
 
 
 @router.get("/websocket/user-states")
-async def get_user_states(_: User = Depends(get_current_active_user)):
+async def get_user_states(_: UserPublic = Depends(get_current_active_user)):
     """Получить все пользовательские состояния"""
-    return {"user_states": user_states}
+    return ORJSONResponse({"user_states": user_states})
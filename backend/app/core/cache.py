@@ -0,0 +1,258 @@
+import asyncio
+import functools
+import hashlib
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+from uuid import UUID
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from redis.exceptions import LockError
+from starlette.responses import Response, StreamingResponse
+
+from app.core.config import settings
+from app.core.metrics import InstrumentedRedis
+from app.core.singleflight import SingleFlight
+from app.models.user import User
+from app.schemas.user import UserPublic
+
+logger = logging.getLogger(__name__)
+
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
+
+CacheScope = Literal["global", "role", "user"]
+
+CACHE_PREFIX = "cache:"
+# Пока один процесс считает значение, остальные ждут его в кэше
+LOCK_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class CacheEntry:
+    media_type: str
+    body: bytes
+
+    def encode(self) -> bytes:
+        return self.media_type.encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CacheEntry":
+        media_type, _, body = data.partition(b"\n")
+        return cls(media_type=media_type.decode(), body=body)
+
+    def to_response(self, status: str) -> Response:
+        return Response(
+            content=self.body, media_type=self.media_type, headers={"X-Cache": status}
+        )
+
+
+single_flight = SingleFlight()
+
+
+def get_namespace_key(namespace: str) -> str:
+    return f"{CACHE_PREFIX}{namespace}:keys"
+
+
+def get_value_key(namespace: str, name: str) -> str:
+    return f"{CACHE_PREFIX}{namespace}:value:{name}"
+
+
+def build_cache_key(
+    namespace: str, name: str, scope: CacheScope, kwargs: dict[str, Any]
+) -> str:
+    """
+    Ключ из пространства имен, эндпоинта, области видимости и параметров.
+
+    Для областей role и user эндпоинт должен принимать текущего пользователя
+    параметром (имя параметра не важно), иначе роль не попадет в ключ.
+    """
+    user = next(
+        (value for value in kwargs.values() if isinstance(value, User | UserPublic)),
+        None,
+    )
+    if scope == "role" and user is None:
+        raise TypeError(
+            f"{name}: cache scope 'role' requires the current user parameter"
+        )
+    if scope == "user":
+        owner = str(user.id) if user else "anonymous"
+    elif scope == "role":
+        owner = "superuser" if user and user.is_superuser else "user"
+    else:
+        owner = "all"
+
+    params = sorted(
+        (param, str(value))
+        for param, value in kwargs.items()
+        if isinstance(value, str | int | float | bool | UUID | None)
+    )
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=12).hexdigest()
+    return f"{CACHE_PREFIX}{namespace}:{name}:{owner}:{digest}"
+
+
+async def render(result: Any) -> CacheEntry | None:
+    """
+    Тело ответа для кэширования, None - если ответ кэшировать нельзя.
+
+    Потоковый ответ читается не дальше CACHE_MAX_BODY_SIZE байт. Если он
+    больше, прочитанные части возвращаются в начало его потока, и ответ
+    отдается клиенту без кэширования.
+    """
+    if isinstance(result, StreamingResponse):
+        if result.status_code != 200:
+            return None
+        chunks: list[bytes] = []
+        size = 0
+        body_iterator = aiter(result.body_iterator)
+        async for chunk in body_iterator:
+            data = chunk if isinstance(chunk, bytes) else str(chunk).encode()
+            chunks.append(data)
+            size += len(data)
+            if size > settings.CACHE_MAX_BODY_SIZE:
+                result.body_iterator = replay(chunks, body_iterator)
+                return None
+        return CacheEntry(result.media_type or "", b"".join(chunks))
+    if isinstance(result, Response):
+        if result.status_code != 200:
+            return None
+        return CacheEntry(result.media_type or "", bytes(result.body))
+    response = ORJSONResponse(jsonable_encoder(result))
+    return CacheEntry(response.media_type or "", bytes(response.body))
+
+
+async def replay(chunks: list[bytes], rest: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    for chunk in chunks:
+        yield chunk
+    async for chunk in rest:
+        yield chunk
+
+
+async def compute(
+    key: str, namespace: str, ttl: int, func: Callable[[], Awaitable[Any]]
+) -> CacheEntry | Response:
+    """
+    Считает значение под распределенной блокировкой.
+
+    Если блокировку держит другой процесс, ждем его результат в кэше
+    не дольше ttl, после чего считаем сами. Блокировка хранит токен
+    владельца, поэтому истекшая блокировка не снимет чужую.
+    """
+    lock_key = f"{key}:lock"
+    lock = redis.lock(lock_key, timeout=ttl, blocking=False)
+    if not await lock.acquire():
+        for _ in range(int(ttl / LOCK_POLL_INTERVAL)):
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.exists(lock_key)
+                data, locked = await pipe.execute()
+            if data is not None:
+                return CacheEntry.decode(data)
+            # Блокировка снята без записи: ответ не кэшируется, считаем сами
+            if not locked:
+                break
+    try:
+        result = await func()
+        entry = await render(result)
+        if entry is None:
+            return result
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, entry.encode(), ex=ttl)
+            pipe.sadd(get_namespace_key(namespace), key)
+            pipe.expire(get_namespace_key(namespace), settings.CACHE_MAX_TTL)
+            await pipe.execute()
+        return entry
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            # Не захватили блокировку или она истекла и досталась другому
+            pass
+
+
+def cached(
+    namespace: str, ttl: int | None = None, scope: CacheScope = "role"
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Кэширует ответ эндпоинта в Redis.
+
+    Ключ строится из пространства имен, имени эндпоинта, пользователя или
+    его роли (scope) и простых параметров запроса. Одновременные промахи
+    объединяются, сбросить кэш можно через invalidate(namespace).
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[Any]],
+    ) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(**kwargs: Any) -> Any:
+            if not settings.CACHE_ENABLED:
+                return await func(**kwargs)
+
+            key = build_cache_key(namespace, func.__name__, scope, kwargs)
+            data = await redis.get(key)
+            if data is not None:
+                return CacheEntry.decode(data).to_response("HIT")
+
+            leading = False
+
+            def lead() -> Awaitable[CacheEntry | Response]:
+                nonlocal leading
+                leading = True
+                return compute(
+                    key,
+                    namespace,
+                    ttl or settings.CACHE_DEFAULT_TTL,
+                    lambda: func(**kwargs),
+                )
+
+            result = await single_flight.do(key, lead)
+            if isinstance(result, CacheEntry):
+                return result.to_response("MISS")
+            if not leading:
+                # Некэшируемый ответ (например, поток) нельзя отдать дважды
+                return await func(**kwargs)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+async def invalidate(*namespaces: str) -> None:
+    """Сбрасывает закэшированные ответы пространств имен"""
+    if not settings.CACHE_ENABLED:
+        return
+    for namespace in namespaces:
+        namespace_key = get_namespace_key(namespace)
+        keys = await redis.smembers(namespace_key)
+        await redis.delete(namespace_key, *keys)
+
+
+async def cached_value(
+    namespace: str, name: str, ttl: int, func: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Кэширует отдельное значение (например, число записей) в пространстве имен.
+
+    Значение сбрасывается вместе с ответами через invalidate(namespace),
+    периодические задачи могут обновлять его заранее.
+    """
+    if not settings.CACHE_ENABLED:
+        return await func()
+
+    key = get_value_key(namespace, name)
+    data = await redis.get(key)
+    if data is not None:
+        return orjson.loads(data)
+
+    value = await single_flight.do(key, func)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(key, orjson.dumps(value), ex=ttl)
+        pipe.sadd(get_namespace_key(namespace), key)
+        pipe.expire(get_namespace_key(namespace), settings.CACHE_MAX_TTL)
+        await pipe.execute()
+    return value
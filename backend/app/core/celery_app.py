@@ -1,16 +1,68 @@
 from celery import Celery
+from kombu import Queue
 
+from app.core.celery_metrics import instrument_celery
 from app.core.config import settings
 
+# Очереди в порядке приоритета: транзакционные письма (восстановление пароля,
+# новый аккаунт) не должны ждать массовых рассылок и импорта
+EMAIL_QUEUE = "email"
+DEFAULT_QUEUE = "default"
+BULK_QUEUE = "bulk"
+
 # Создаем экземпляр Celery с указанием брокера и бекенда для результатов
 celery_app = Celery(
     "backend",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.email", "app.tasks.maintenance", "app.tasks.users"],
+)
+
+celery_app.conf.update(
+    task_queues=[Queue(EMAIL_QUEUE), Queue(DEFAULT_QUEUE), Queue(BULK_QUEUE)],
+    task_default_queue=DEFAULT_QUEUE,
+    # Точные имена задач проверяются раньше шаблонов
+    task_routes={
+        "app.tasks.email.send_email_batch_task": {"queue": BULK_QUEUE},
+        "app.tasks.users.*": {"queue": BULK_QUEUE},
+        "app.tasks.email.*": {"queue": EMAIL_QUEUE},
+        "app.tasks.*": {"queue": DEFAULT_QUEUE},
+    },
+    broker_transport_options={
+        # Воркер, слушающий несколько очередей, сначала разбирает первую
+        "queue_order_strategy": "priority",
+        "visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT,
+    },
+    worker_prefetch_multiplier=settings.CELERY_PREFETCH_MULTIPLIER,
+    task_acks_late=settings.CELERY_ACKS_LATE,
+    task_reject_on_worker_lost=settings.CELERY_ACKS_LATE,
+    task_compression=settings.CELERY_COMPRESSION,
+    result_compression=settings.CELERY_COMPRESSION,
+    result_expires=settings.CELERY_RESULT_EXPIRES,
 )
 
-# Настройка маршрутизации задач: все задачи из app.tasks.* отправляются в очередь "default"
-celery_app.conf.task_routes = {
-    "app.tasks.*": {"queue": "default"},
+if settings.METRICS_ENABLED:
+    instrument_celery()
+
+# Периодические задачи обслуживания, запускаются отдельным процессом celery beat.
+# Запуск, не взятый воркером до следующего, отбрасывается
+celery_app.conf.beat_schedule = {
+    name: {"task": task, "schedule": interval, "options": {"expires": interval}}
+    for name, task, interval in (
+        (
+            "reap-websocket-sessions",
+            "app.tasks.maintenance.reap_websocket_sessions_task",
+            settings.MAINTENANCE_WEBSOCKET_REAP_INTERVAL,
+        ),
+        (
+            "refresh-user-count",
+            "app.tasks.maintenance.refresh_user_count_task",
+            settings.MAINTENANCE_USER_COUNT_INTERVAL,
+        ),
+        (
+            "prune-task-results",
+            "app.tasks.maintenance.prune_task_results_task",
+            settings.MAINTENANCE_RESULTS_PRUNE_INTERVAL,
+        ),
+    )
 }
-# TODO возможно понадобится celery beat для периодических задач
@@ -0,0 +1,127 @@
+import os
+import time
+from datetime import datetime
+from typing import Any
+
+from celery import Task
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_init,
+)
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+from app.core.config import settings
+from app.core.metrics import (
+    CELERY_TASK_FAILURES,
+    CELERY_TASK_QUEUE_SECONDS,
+    CELERY_TASK_RETRIES,
+    CELERY_TASK_RUN_SECONDS,
+    InstrumentedRedis,
+)
+
+# Заголовок сообщения со временем постановки задачи в очередь
+PUBLISHED_AT_HEADER = "published_at"
+# Ключи списков транспорта Redis: основной и по одному на шаг приоритета
+PRIORITY_SEPARATOR = "\x06\x16"
+PRIORITY_STEPS = (3, 6, 9)
+UNACKED_KEY = "unacked"
+
+broker = InstrumentedRedis.from_url(settings.CELERY_BROKER_URL)
+
+# Время начала выполнения задач процесса по task_id
+task_started: dict[str, float] = {}
+
+
+def set_published_at(headers: dict[str, Any] | None = None, **_: Any) -> None:
+    if headers is not None:
+        headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+def observe_task_start(task_id: str, task: Task, **_: Any) -> None:
+    task_started[task_id] = time.perf_counter()
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is None:
+        return
+    # Отложенная задача (countdown, повтор) ждет с момента eta, а не публикации
+    eta = task.request.eta
+    if eta:
+        published_at = max(published_at, _timestamp(eta))
+    CELERY_TASK_QUEUE_SECONDS.labels(task.name).observe(
+        max(0.0, time.time() - published_at)
+    )
+
+
+def observe_task_finish(
+    task_id: str, task: Task, state: str | None = None, **_: Any
+) -> None:
+    started = task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_RUN_SECONDS.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+def count_retry(sender: Task, **_: Any) -> None:
+    CELERY_TASK_RETRIES.labels(sender.name).inc()
+
+
+def count_failure(sender: Task, **_: Any) -> None:
+    CELERY_TASK_FAILURES.labels(sender.name).inc()
+
+
+def start_metrics_server(**_: Any) -> None:
+    """Отдает метрики воркера, в prefork - суммарно по всем процессам пула"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(settings.CELERY_METRICS_PORT, registry=registry)
+    else:
+        start_http_server(settings.CELERY_METRICS_PORT)
+
+
+def _timestamp(value: str | datetime) -> float:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def instrument_celery() -> None:
+    """
+    Подключает метрики задач через сигналы Celery: время ожидания в очереди,
+    время выполнения по итоговому состоянию, повторы и ошибки.
+
+    Время публикации передается заголовком сообщения, поэтому учет работает
+    и для задач, поставленных API, и для повторов из воркера.
+    """
+    before_task_publish.connect(set_published_at, weak=False)
+    task_prerun.connect(observe_task_start, weak=False)
+    task_postrun.connect(observe_task_finish, weak=False)
+    task_retry.connect(count_retry, weak=False)
+    task_failure.connect(count_failure, weak=False)
+    if settings.CELERY_METRICS_PORT:
+        worker_init.connect(start_metrics_server, weak=False)
+
+
+async def get_queue_depths(queues: list[str]) -> dict[str, int]:
+    """Число сообщений в очередях брокера Redis, включая приоритетные списки"""
+    async with broker.pipeline(transaction=False) as pipe:
+        for queue in queues:
+            pipe.llen(queue)
+            for step in PRIORITY_STEPS:
+                pipe.llen(f"{queue}{PRIORITY_SEPARATOR}{step}")
+        lengths = await pipe.execute()
+
+    keys_per_queue = len(PRIORITY_STEPS) + 1
+    return {
+        queue: sum(lengths[index * keys_per_queue : (index + 1) * keys_per_queue])
+        for index, queue in enumerate(queues)
+    }
+
+
+async def get_unacked_count() -> int:
+    """Задачи, полученные воркерами, но еще не подтвержденные"""
+    return int(await broker.hlen(UNACKED_KEY))  # type: ignore
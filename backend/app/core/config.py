@@ -1,17 +1,20 @@
+import json
 import secrets
 import uuid
 import warnings
+from ipaddress import ip_network
 from typing import Annotated, Any, Literal, Self
 
 from pydantic import (
     AnyUrl,
     BeforeValidator,
     HttpUrl,
+    IPvAnyNetwork,
     PostgresDsn,
     computed_field,
     model_validator,
 )
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 def parse_cors(v: Any) -> list[str] | str:
@@ -22,6 +25,15 @@ def parse_cors(v: Any) -> list[str] | str:
     raise ValueError(v)
 
 
+def parse_comma_list(v: Any) -> Any:
+    """Список из строки через запятую или JSON массива"""
+    if isinstance(v, str):
+        if v.startswith("["):
+            return json.loads(v)
+        return [i.strip() for i in v.split(",") if i.strip()]
+    return v
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         # Use top level .env file (one level above ./backend/)
@@ -31,8 +43,12 @@ class Settings(BaseSettings):
     )
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Добавлять в access токен данные пользователя (UserPublic), чтобы
+    # авторизация и /users/me обходились без запроса к базе
+    ACCESS_TOKEN_USER_CLAIMS: bool = True
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -42,6 +58,13 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: Annotated[
         list[AnyUrl] | str, BeforeValidator(parse_cors)
     ] = []
+    # Сети прокси (Traefik), которым доверяется X-Forwarded-For при
+    # определении IP клиента. По умолчанию только loopback: клиент из
+    # доверенной сети может подставить любой IP и обойти ограничения по IP,
+    # поэтому развертывание указывает точную подсеть своего прокси
+    TRUSTED_PROXIES: Annotated[
+        list[IPvAnyNetwork], NoDecode, BeforeValidator(parse_comma_list)
+    ] = [ip_network("127.0.0.0/8"), ip_network("::1/128")]
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -52,6 +75,18 @@ class Settings(BaseSettings):
 
     PROJECT_NAME: str
     SENTRY_DSN: HttpUrl | None = None
+    # GET /metrics без авторизации. Наружу traefik его не пропускает
+    # (docker-compose.yml), Prometheus опрашивает контейнер внутри сети
+    METRICS_ENABLED: bool = True
+
+    # Профилирование SQL запросов вместо echo. Медленные запросы и N+1
+    # пишутся в лог всегда, остальные - с долей SQL_LOG_SAMPLE_RATE
+    SQL_ECHO: bool = False
+    SQL_PROFILING_ENABLED: bool = True
+    SQL_SLOW_QUERY_MS: float = 100
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+    SQL_LOG_SAMPLE_RATE: float = 0.01
+
     POSTGRES_SERVER: str
     POSTGRES_PORT: int = 5432
     POSTGRES_USER: str
@@ -76,6 +111,10 @@ class Settings(BaseSettings):
     SMTP_HOST: str | None = None
     SMTP_USER: str | None = None
     SMTP_PASSWORD: str | None = None
+    # Соединения SMTP переиспользуются воркером, простаивающие дольше
+    # SMTP_IDLE_TIMEOUT секунд закрываются
+    SMTP_POOL_SIZE: int = 4
+    SMTP_IDLE_TIMEOUT: float = 60
     # TODO: update type to EmailStr when sqlmodel supports it
     EMAILS_FROM_EMAIL: str | None = None
     EMAILS_FROM_NAME: str | None = None
@@ -87,6 +126,38 @@ class Settings(BaseSettings):
         return self
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # Ограничения восстановления пароля за скользящее окно в секундах,
+    # отдельно для email и IP клиента
+    PASSWORD_RECOVERY_WINDOW: int = 60 * 60
+    PASSWORD_RECOVERY_EMAIL_LIMIT: int = 3
+    PASSWORD_RECOVERY_IP_LIMIT: int = 20
+    # Повторный запрос для того же email в течение этого времени не ставит
+    # новое письмо в очередь
+    PASSWORD_RECOVERY_DEDUP_SECONDS: int = 5 * 60
+    # Неудачные входы: после LOGIN_*_FREE_ATTEMPTS ошибок за LOGIN_FAILURE_WINDOW
+    # секунд вход для аккаунта или IP блокируется на LOGIN_BACKOFF_BASE секунд,
+    # каждая следующая ошибка удваивает блокировку до LOGIN_BACKOFF_MAX
+    LOGIN_ACCOUNT_FREE_ATTEMPTS: int = 5
+    LOGIN_IP_FREE_ATTEMPTS: int = 20
+    LOGIN_BACKOFF_BASE: int = 1
+    LOGIN_BACKOFF_MAX: int = 15 * 60
+    LOGIN_FAILURE_WINDOW: int = 60 * 60
+    # Потоки для проверки паролей, ограничивают нагрузку bcrypt на процесс
+    PASSWORD_HASH_WORKERS: int = 2
+    # Схема и параметры хэширования паролей, подбираются скриптом
+    # scripts/benchmark_password_hash.py. При изменении хэши пересчитываются
+    # при следующем входе пользователя. Память argon2 в KiB
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_MEMORY_COST: int = 64 * 1024
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    # Число скомпилированных шаблонов писем в памяти процесса. В local
+    # шаблоны перечитываются при изменении файла
+    EMAIL_TEMPLATES_CACHE_SIZE: int = 50
+    # celery - письма отправляет воркер, inline - пул потоков API через
+    # SMTP_HOST (для тестов с локальной заглушкой SMTP)
+    EMAIL_DISPATCH: Literal["celery", "inline"] = "celery"
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -104,6 +175,30 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str = ""
     REDIS_URL: str = "redis://redis:6379"
 
+    # Кэш ответов эндпоинтов в Redis (app.core.cache), время жизни в секундах
+    CACHE_ENABLED: bool = True
+    CACHE_DEFAULT_TTL: int = 5
+    CACHE_MAX_TTL: int = 3600
+    # Потоковые ответы больше этого размера в байтах не кэшируются и отдаются
+    # клиенту потоком, не накапливаясь в памяти
+    CACHE_MAX_BODY_SIZE: int = 1024 * 1024
+    # Число пользователей кэшируется отдельно и пересчитывается задачей
+    # обслуживания, время жизни больше интервала пересчета
+    USER_COUNT_CACHE_TTL: int = 600
+
+    # Периодические задачи обслуживания (celery beat), интервалы в секундах
+    MAINTENANCE_WEBSOCKET_REAP_INTERVAL: int = 60
+    MAINTENANCE_USER_COUNT_INTERVAL: int = 300
+    MAINTENANCE_RESULTS_PRUNE_INTERVAL: int = 60 * 60
+    MAINTENANCE_SCAN_BATCH_SIZE: int = 500
+    # WebSocket сервер обновляет запись о себе раз в 30 секунд, не
+    # обновлявшиеся дольше WEBSOCKET_SERVER_TTL секунд считаются упавшими
+    WEBSOCKET_SERVER_TTL: int = 120
+
+    # Количество шардов канала websocket_responses (0 - единый канал).
+    # Должно совпадать с настройкой WebSocket серверов
+    WEBSOCKET_RESPONSE_SHARDS: int = 256
+
     # File storage settings
     USE_S3: bool = False
     S3_ENDPOINT_URL: str | None = None
@@ -112,6 +207,22 @@ class Settings(BaseSettings):
     S3_BUCKET_NAME: str | None = None
     S3_REGION: str | None = None
     LOCAL_STORAGE_PATH: str = "uploads"
+    # Загрузка и выдача файлов идут частями по STORAGE_CHUNK_SIZE байт,
+    # файлы больше UPLOAD_MAX_SIZE отклоняются
+    STORAGE_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_SIZE: int = 100 * 1024 * 1024
+
+    # Объединять одинаковые одновременные чтения репозиториев в один запрос
+    REPOSITORY_SINGLE_FLIGHT: bool = True
+
+    # Размер пачки строк при потоковой выдаче списков
+    STREAMING_BATCH_SIZE: int = 500
+
+    # Массовый импорт и экспорт пользователей. Файлы импорта больше
+    # USER_IMPORT_MAX_SIZE байт отклоняются
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    USER_IMPORT_MAX_SIZE: int = 50 * 1024 * 1024
+    USER_EXPORT_BATCH_SIZE: int = 1000
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -138,6 +249,21 @@ class Settings(BaseSettings):
     def CELERY_RESULT_BACKEND(self) -> str:
         return self.CELERY_BROKER_URL
 
+    # Воркер берет по CELERY_PREFETCH_MULTIPLIER задач на процесс, чтобы
+    # долгая задача не задерживала уже полученные письма
+    CELERY_PREFETCH_MULTIPLIER: int = 1
+    # Задача подтверждается после выполнения и при падении воркера будет
+    # выдана повторно. Задачи дольше CELERY_VISIBILITY_TIMEOUT секунд Redis
+    # тоже выдаст повторно, поэтому таймаут больше самого долгого импорта.
+    # Отдельные письма подтверждаются сразу, см. app.tasks.email
+    CELERY_ACKS_LATE: bool = True
+    CELERY_VISIBILITY_TIMEOUT: int = 60 * 60 * 6
+    CELERY_COMPRESSION: Literal["gzip", "bzip2", "zlib"] | None = "gzip"
+    # Результаты задач хранятся в Redis CELERY_RESULT_EXPIRES секунд
+    CELERY_RESULT_EXPIRES: int = 60 * 60 * 24
+    # Порт, на котором воркер отдает метрики задач Prometheus, 0 - не отдавать
+    CELERY_METRICS_PORT: int = 9808
+
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
             message = (
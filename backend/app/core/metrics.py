@@ -0,0 +1,223 @@
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess,
+)
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Метки - только идентификаторы маршрутов из custom_generate_unique_id,
+# поэтому количество временных рядов не зависит от параметров запросов
+disable_created_metrics()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HTTP_REQUESTS = Counter("http_requests", "HTTP requests", ["route", "method", "status"])
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being processed",
+    multiprocess_mode="livesum",
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Database time per HTTP request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Database query latency", buckets=FAST_BUCKETS
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds",
+    "Redis command latency",
+    ["command"],
+    buckets=FAST_BUCKETS,
+)
+REPOSITORY_READS = Counter(
+    "repository_reads",
+    "Repository lookups by outcome: own query or coalesced with an in-flight one",
+    ["method", "result"],
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing and verifying passwords",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+MAINTENANCE_JOB_RUNS = Counter(
+    "maintenance_job_runs",
+    "Periodic maintenance job runs by outcome",
+    ["job", "result"],
+)
+MAINTENANCE_JOB_SECONDS = Histogram(
+    "maintenance_job_duration_seconds",
+    "Periodic maintenance job duration",
+    ["job"],
+    buckets=LATENCY_BUCKETS,
+)
+CELERY_TASK_QUEUE_SECONDS = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between task publish (or eta) and start of execution",
+    ["task"],
+    buckets=(*LATENCY_BUCKETS, 30, 60, 300, 900),
+)
+CELERY_TASK_RUN_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time by final state",
+    ["task", "state"],
+    buckets=(*LATENCY_BUCKETS, 30, 60, 300, 900),
+)
+CELERY_TASK_RETRIES = Counter("celery_task_retries", "Celery task retries", ["task"])
+CELERY_TASK_FAILURES = Counter(
+    "celery_task_failures", "Celery tasks failed after all retries", ["task"]
+)
+PASSWORD_REHASHES = Counter(
+    "password_rehashes",
+    "Password hashes upgraded on login to the current scheme and parameters",
+)
+RATE_LIMITED = Counter(
+    "rate_limited_requests", "Requests rejected by rate limits", ["limit"]
+)
+
+
+@dataclass
+class RequestStats:
+    """Статистика обращений к базе данных в рамках одного запроса"""
+
+    db_queries: int = 0
+    db_seconds: float = 0.0
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def get_route_id(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    return str(getattr(route, "unique_id", None) or getattr(route, "name", "unknown"))
+
+
+class PrometheusMiddleware:
+    """ASGI middleware для метрик HTTP запросов"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            request_stats.reset(token)
+
+            # Маршрут известен только после того, как роутер обработал запрос
+            route_id = get_route_id(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.labels(route_id, method, str(status_code)).inc()
+            HTTP_REQUEST_SECONDS.labels(route_id, method).observe(duration)
+            HTTP_REQUEST_DB_QUERIES.labels(route_id).observe(stats.db_queries)
+            HTTP_REQUEST_DB_SECONDS.labels(route_id).observe(stats.db_seconds)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключает учет времени SQL запросов через события SQLAlchemy"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Any, *_: Any) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def finish_query(conn: Any) -> None:
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.observe(duration)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += duration
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn: Any, *_: Any) -> None:
+        finish_query(conn)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context: ExceptionContext) -> None:
+        # Упавший запрос не вызывает after_cursor_execute. Без контекста
+        # выполнения ошибка произошла до before_cursor_execute
+        conn = context.connection
+        if context.execution_context is None or conn is None:
+            return
+        if conn.info.get("query_started"):
+            finish_query(conn)
+
+
+class InstrumentedRedis(Redis):
+    """Клиент Redis, измеряющий время выполнения команд"""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(str(args[0]).upper()).observe(
+                time.perf_counter() - started
+            )
+
+
+def metrics_endpoint(_request: Request) -> Response:
+    """Метрики в формате Prometheus"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # При запуске с несколькими воркерами собираем метрики всех процессов
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
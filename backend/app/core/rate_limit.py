@@ -0,0 +1,156 @@
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMITED, InstrumentedRedis
+
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
+
+RATE_LIMIT_PREFIX = "rate_limit:"
+
+
+def get_key(name: str, identity: str) -> str:
+    # Email и IP не хранятся в Redis в открытом виде
+    digest = hashlib.blake2b(identity.lower().encode(), digest_size=12)
+    return f"{RATE_LIMIT_PREFIX}{name}:{digest.hexdigest()}"
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Не больше limit попыток за скользящее окно window секунд"""
+
+    name: str
+    limit: int
+    window: int
+
+    def key(self, identity: str) -> str:
+        return get_key(self.name, identity)
+
+
+async def hit(*checks: tuple[RateLimit, str]) -> int:
+    """
+    Учитывает попытку во всех ограничениях за один запрос к Redis.
+
+    Возвращает, через сколько секунд можно повторить, или 0, если попытка
+    разрешена. Отклоненные попытки тоже учитываются, поэтому окно сдвигается,
+    пока клиент продолжает запросы, но в ZSET хранится не больше limit + 1
+    последних попыток.
+    """
+    now = time.time()
+    member = f"{now}:{uuid4().hex}"
+    async with redis.pipeline(transaction=True) as pipe:
+        for rate_limit, identity in checks:
+            key = rate_limit.key(identity)
+            pipe.zremrangebyscore(key, 0, now - rate_limit.window)
+            pipe.zadd(key, {member: now})
+            pipe.zcard(key)
+            # Попытка, после истечения которой в окне освободится место
+            pipe.zrange(key, -rate_limit.limit, -rate_limit.limit, withscores=True)
+            pipe.zremrangebyrank(key, 0, -(rate_limit.limit + 2))
+            pipe.expire(key, rate_limit.window)
+        results = await pipe.execute()
+
+    retry_after = 0
+    for index, (rate_limit, _) in enumerate(checks):
+        _, _, count, boundary, _, _ = results[index * 6 : (index + 1) * 6]
+        if count > rate_limit.limit:
+            RATE_LIMITED.labels(rate_limit.name).inc()
+            expires_at = boundary[0][1] + rate_limit.window if boundary else now
+            retry_after = max(retry_after, math.ceil(expires_at - now), 1)
+    return retry_after
+
+
+async def enforce(*checks: tuple[RateLimit, str]) -> None:
+    """Отклоняет запрос с 429, если превышено любое из ограничений"""
+    retry_after = await hit(*checks)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def acquire_once(name: str, identity: str, ttl: int) -> bool:
+    """
+    Возвращает True, если действие для identity не выполнялось последние
+    ttl секунд, и помечает его выполненным.
+    """
+    return bool(await redis.set(get_key(name, identity), 1, ex=ttl, nx=True))
+
+
+async def release_once(name: str, identity: str) -> None:
+    """Снимает отметку acquire_once, если действие не состоялось"""
+    await redis.delete(get_key(name, identity))
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """
+    Экспоненциальная задержка после неудачных попыток.
+
+    Первые free_attempts ошибок за window секунд не ограничиваются, далее
+    каждая следующая удваивает блокировку от base_delay до max_delay.
+    """
+
+    name: str
+    free_attempts: int
+    base_delay: int
+    max_delay: int
+    window: int
+
+    def failures_key(self, identity: str) -> str:
+        return get_key(f"{self.name}:failures", identity)
+
+    def lock_key(self, identity: str) -> str:
+        return get_key(f"{self.name}:lock", identity)
+
+    def delay(self, failures: int) -> int:
+        excess = failures - self.free_attempts
+        if excess <= 0:
+            return 0
+        return min(self.base_delay * 2 ** min(excess - 1, 32), self.max_delay)
+
+
+async def get_lockout(*checks: tuple[Backoff, str]) -> int:
+    """
+    Сколько секунд еще действует самая долгая из блокировок, 0 - если нет.
+
+    Только читает состояние: незавершенные попытки не считаются неудачными,
+    поэтому одновременные верные входы не мешают друг другу.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for backoff, identity in checks:
+            pipe.ttl(backoff.lock_key(identity))
+        ttls = await pipe.execute()
+    lockout = 0
+    for (backoff, _), ttl in zip(checks, ttls, strict=True):
+        if ttl > 0:
+            RATE_LIMITED.labels(backoff.name).inc()
+            lockout = max(lockout, ttl)
+    return lockout
+
+
+async def register_failure(*checks: tuple[Backoff, str]) -> None:
+    """Учитывает неудачную попытку и при необходимости ставит блокировку"""
+    async with redis.pipeline(transaction=True) as pipe:
+        for backoff, identity in checks:
+            pipe.incr(backoff.failures_key(identity))
+            pipe.expire(backoff.failures_key(identity), backoff.window, nx=True)
+        results = await pipe.execute()
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for (backoff, identity), failures in zip(checks, results[::2], strict=True):
+            delay = backoff.delay(failures)
+            if delay:
+                pipe.set(backoff.lock_key(identity), 1, ex=delay)
+        await pipe.execute()
+
+
+async def reset_failures(backoff: Backoff, identity: str) -> None:
+    await redis.delete(backoff.failures_key(identity), backoff.lock_key(identity))
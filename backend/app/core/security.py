@@ -1,27 +1,133 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 from typing import Any
+from uuid import uuid4
 
 import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_SECONDS
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_pwd_context(
+    scheme: str = settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds: int = settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_memory_cost: int = settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2_time_cost: int = settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_parallelism: int = settings.PASSWORD_ARGON2_PARALLELISM,
+) -> CryptContext:
+    """
+    Контекст хэширования с заданной схемой и параметрами.
+
+    Хэши другой схемы или с другими параметрами проверяются как обычно,
+    но считаются устаревшими и пересчитываются при входе.
+    """
+    return CryptContext(
+        schemes=[scheme, "argon2" if scheme == "bcrypt" else "bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__time_cost=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_pwd_context()
+
+# Хэширование паролей в event loop блокирует все запросы процесса, поэтому
+# хэширование и проверки выполняются в отдельном пуле ограниченного размера
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    claims: dict[str, Any] | None = None,
+) -> str:
     expire = datetime.now(UTC) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid4().hex,
+        "type": "access",
+    }
+    if claims:
+        to_encode.update(claims)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def create_refresh_token(
+    subject: str | Any, expires_delta: timedelta, version: int
+) -> str:
+    expire = datetime.now(UTC) + expires_delta
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid4().hex,
+        "type": "refresh",
+        "ver": version,
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with PASSWORD_HASH_SECONDS.labels("verify").time():
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with PASSWORD_HASH_SECONDS.labels("hash").time():
+        return pwd_context.hash(password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash в пуле password_hash_executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_hash_executor, get_password_hash, password
+    )
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str | None
+) -> tuple[bool, str | None]:
+    """
+    Проверяет пароль и, если хэш устарел, возвращает новый.
+
+    Для hashed_password=None выполняет холостую проверку той же стоимости,
+    чтобы по времени ответа нельзя было узнать, зарегистрирован ли email.
+    """
+    with PASSWORD_HASH_SECONDS.labels("verify").time():
+        if hashed_password is None:
+            pwd_context.dummy_verify()
+            return False, None
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str | None
+) -> tuple[bool, str | None]:
+    """verify_and_update_password в пуле password_hash_executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_hash_executor,
+        verify_and_update_password,
+        plain_password,
+        hashed_password,
+    )
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str | None
+) -> bool:
+    valid, _ = await verify_and_update_password_async(plain_password, hashed_password)
+    return valid
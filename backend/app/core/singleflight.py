@@ -0,0 +1,53 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одним ключом в рамках процесса:
+    функция выполняется один раз, остальные вызовы получают ее результат.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[Any]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        """Есть ли уже выполняющийся вызов с этим ключом"""
+        return key in self._calls
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет func или ждет результат уже идущего вызова с этим ключом.
+
+        Если ведущий вызов отменен (например, его клиент отключился),
+        ожидающие не получают CancelledError, а повторяют вызов сами.
+        """
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                # Отменен сам ожидающий, а не ведущий вызов
+                if not future.cancelled() or (task and task.cancelling()):
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получит ведущий вызов, ожидающих может не быть
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -0,0 +1,66 @@
+import time
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import InstrumentedRedis
+
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
+
+# Версии данных пользователей в access токенах. Хранятся только для
+# пользователей, которые менялись, отсутствие записи означает версию 0
+TOKEN_VERSIONS_KEY = "user_token_versions"
+# Версии сессий пользователей для refresh токенов, меняются только при
+# смене пароля, деактивации или удалении
+SESSION_VERSIONS_KEY = "user_session_versions"
+# Отозванные токены по jti, ключ живет не дольше самого токена
+REVOKED_TOKEN_PREFIX = "revoked_token:"
+
+
+async def get_token_version(user_id: UUID | str) -> int:
+    version = await redis.hget(TOKEN_VERSIONS_KEY, str(user_id))
+    return int(version) if version is not None else 0
+
+
+async def get_session_version(user_id: UUID | str) -> int:
+    version = await redis.hget(SESSION_VERSIONS_KEY, str(user_id))
+    return int(version) if version is not None else 0
+
+
+async def get_token_state(user_id: UUID | str, jti: str | None) -> tuple[int, bool]:
+    """Текущая версия пользователя и признак отзыва токена за один запрос"""
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hget(TOKEN_VERSIONS_KEY, str(user_id))
+        pipe.exists(f"{REVOKED_TOKEN_PREFIX}{jti}")
+        version, revoked = await pipe.execute()
+    return (int(version) if version is not None else 0), bool(jti and revoked)
+
+
+async def revoke_user_claims(user_id: UUID | str) -> int:
+    """
+    Увеличивает версию данных пользователя.
+
+    Данные в выданных access токенах перестают считаться актуальными и
+    читаются из базы, сессии пользователя при этом сохраняются. Должна
+    вызываться при любом изменении пользователя.
+    """
+    return int(await redis.hincrby(TOKEN_VERSIONS_KEY, str(user_id), 1))
+
+
+async def revoke_user_sessions(user_id: UUID | str) -> None:
+    """
+    Завершает все сессии пользователя: выданные refresh токены перестают
+    быть действительными, данные в access токенах - актуальными.
+
+    Вызывается при смене пароля, деактивации, удалении пользователя и
+    повторном использовании refresh токена.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hincrby(TOKEN_VERSIONS_KEY, str(user_id), 1)
+        pipe.hincrby(SESSION_VERSIONS_KEY, str(user_id), 1)
+        await pipe.execute()
+
+
+async def revoke_token(jti: str, expires_at: float) -> bool:
+    """Отзывает токен, возвращает False, если он уже был отозван"""
+    ttl = max(1, int(expires_at - time.time()))
+    return bool(await redis.set(f"{REVOKED_TOKEN_PREFIX}{jti}", 1, ex=ttl, nx=True))
@@ -0,0 +1,191 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import get_route_id
+
+logger = logging.getLogger(__name__)
+
+# Нормализация запроса: значения и параметры заменяются на "?",
+# списки IN (...) и VALUES (...) схлопываются, пробелы сжимаются
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Нормализованный вид SQL запроса без конкретных значений"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PARAMETER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _VALUE_LIST.sub("(...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+@dataclass
+class QueryStats:
+    """Накопленная статистика по одному отпечатку запроса"""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    slow_count: int = 0
+    n_plus_one_count: int = 0
+
+
+@dataclass
+class RequestProfile:
+    """Запросы к базе данных в рамках одного HTTP запроса"""
+
+    queries: dict[str, int] = field(default_factory=dict)
+
+
+request_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "request_profile", default=None
+)
+
+
+class QueryProfiler:
+    """
+    Агрегирует SQL запросы процесса по отпечаткам.
+
+    Медленные запросы и N+1 (один и тот же отпечаток много раз за запрос)
+    всегда попадают в лог, остальные - с вероятностью sample_rate.
+    """
+
+    def __init__(
+        self,
+        slow_query_seconds: float,
+        n_plus_one_threshold: int,
+        sample_rate: float,
+        max_fingerprints: int = 1000,
+    ) -> None:
+        self.slow_query_seconds = slow_query_seconds
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.sample_rate = sample_rate
+        self.max_fingerprints = max_fingerprints
+        self.stats: dict[str, QueryStats] = {}
+        self.started_at = time.time()
+        # События движка вызываются из greenlet'ов asyncpg в потоке цикла,
+        # но синхронные движки могут работать и из пула потоков
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                if len(self.stats) >= self.max_fingerprints:
+                    key = "<other>"
+                stats = self.stats.setdefault(key, QueryStats())
+            stats.count += 1
+            stats.total_seconds += duration
+            stats.max_seconds = max(stats.max_seconds, duration)
+            slow = duration >= self.slow_query_seconds
+            if slow:
+                stats.slow_count += 1
+
+        profile = request_profile.get()
+        if profile is not None:
+            profile.queries[key] = profile.queries.get(key, 0) + 1
+
+        if slow:
+            self._log(logging.WARNING, "slow_query", key, duration_ms=duration * 1000)
+        elif self.sample_rate and random.random() < self.sample_rate:
+            self._log(logging.INFO, "query", key, duration_ms=duration * 1000)
+
+    def finish_request(self, route_id: str, profile: RequestProfile) -> None:
+        """Проверяет запрос на повторяющиеся одинаковые обращения к базе"""
+        for key, count in profile.queries.items():
+            if count < self.n_plus_one_threshold:
+                continue
+            with self._lock:
+                if key in self.stats:
+                    self.stats[key].n_plus_one_count += 1
+            self._log(logging.WARNING, "n_plus_one", key, route=route_id, count=count)
+
+    def snapshot(self, limit: int) -> list[tuple[str, QueryStats]]:
+        """Самые затратные по суммарному времени запросы"""
+        with self._lock:
+            items = [
+                (key, QueryStats(**vars(stats))) for key, stats in self.stats.items()
+            ]
+        items.sort(key=lambda item: item[1].total_seconds, reverse=True)
+        return items[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+            self.started_at = time.time()
+
+    @staticmethod
+    def _log(level: int, kind: str, key: str, **extra: Any) -> None:
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({"event": kind, "sql": key, **extra}))
+
+
+profiler = QueryProfiler(
+    slow_query_seconds=settings.SQL_SLOW_QUERY_MS / 1000,
+    n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    sample_rate=settings.SQL_LOG_SAMPLE_RATE,
+)
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware, собирающее запросы к базе в рамках HTTP запроса"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = request_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_profile.reset(token)
+            if profile.queries:
+                profiler.finish_request(get_route_id(scope), profile)
+
+
+def install_profiler(engine: AsyncEngine) -> None:
+    """Подключает профилировщик к событиям SQLAlchemy"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Any, *_: Any) -> None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+        duration = time.perf_counter() - conn.info["profile_started"].pop()
+        profiler.record(statement, duration)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context: ExceptionContext) -> None:
+        # Упавший запрос не вызывает after_cursor_execute
+        conn = context.connection
+        if context.execution_context is None or conn is None:
+            return
+        if conn.info.get("profile_started"):
+            duration = time.perf_counter() - conn.info["profile_started"].pop()
+            profiler.record(context.statement or "", duration)
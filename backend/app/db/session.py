@@ -3,15 +3,29 @@ from collections.abc import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.profiler import install_profiler
 
 async_engine = create_async_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI), echo=True, future=True
+    str(settings.SQLALCHEMY_DATABASE_URI), echo=settings.SQL_ECHO, future=True
 )
+if settings.METRICS_ENABLED:
+    instrument_engine(async_engine)
+if settings.SQL_PROFILING_ENABLED:
+    install_profiler(async_engine)
+
 async_session = async_sessionmaker(
     bind=async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+def get_sync_dsn() -> str:
+    """DSN для psycopg2 в задачах Celery, где нет event loop"""
+    return str(settings.SQLALCHEMY_DATABASE_URI).replace(
+        "postgresql+asyncpg://", "postgresql://", 1
+    )
+
+
 # async def init_db():
 #     async with async_engine.begin() as conn:
 #         # SQLModel.metadata.drop_all(conn)
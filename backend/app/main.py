@@ -4,12 +4,14 @@ from contextlib import asynccontextmanager
 
 import sentry_sdk
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
-from redis.asyncio import Redis
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.v1.main import api_router
 from app.core.config import settings
+from app.core.metrics import InstrumentedRedis, PrometheusMiddleware, metrics_endpoint
+from app.db.profiler import QueryProfilerMiddleware
 from app.websockets.handlers import handle_disconnect, handle_message
 
 
@@ -21,7 +23,7 @@ if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
 # Инициализация Redis
-redis = Redis.from_url(settings.REDIS_URL)
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
 
 
 async def websocket_event_handler():
@@ -38,7 +40,9 @@ async def websocket_event_handler():
                 if data.get("event_type") == "disconnect":
                     await handle_disconnect(client_id)
                 else:
-                    await handle_message(client_id, data.get("event"))
+                    await handle_message(
+                        client_id, data.get("event"), data.get("server_id")
+                    )
             except json.JSONDecodeError:
                 continue
 
@@ -58,6 +62,8 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
     lifespan=lifespan,
+    # orjson сериализует UUID и datetime сам и заметно быстрее json.dumps
+    default_response_class=ORJSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -70,4 +76,11 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+if settings.SQL_PROFILING_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,11 +1,20 @@
 from typing import Any, Generic, TypeVar
 
 from sqlalchemy import and_
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.config import settings
+from app.core.metrics import REPOSITORY_READS
+from app.core.singleflight import SingleFlight
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 
+# Одинаковые одновременные чтения в рамках процесса выполняются одним запросом
+repository_reads = SingleFlight()
+
 
 class FilterOperator:
     EQ = "eq"  # равно
@@ -25,6 +34,38 @@ class BaseRepository(Generic[ModelType]):
         self.model = model
         self.session = session
 
+    async def _get_one_coalesced(
+        self, method: str, key: Any, query: SelectOfScalar[ModelType]
+    ) -> ModelType | None:
+        """
+        Выполняет запрос одной записи, объединяя его с таким же запросом,
+        уже выполняющимся в другой сессии этого процесса.
+
+        Объекты сессии нельзя передавать в другую сессию, поэтому ведущий
+        вызов отдает снимок колонок, а остальные добавляют его копию
+        в свою сессию через merge(load=False) без обращения к базе.
+        """
+        if not settings.REPOSITORY_SINGLE_FLIGHT:
+            return (await self.session.exec(query)).one_or_none()
+
+        loaded: ModelType | None = None
+
+        async def load() -> dict[str, Any] | None:
+            nonlocal loaded
+            loaded = (await self.session.exec(query)).one_or_none()
+            return None if loaded is None else loaded.model_dump()
+
+        flight_key = f"{self.model.__name__}.{method}:{key}"
+        coalesced = flight_key in repository_reads
+        snapshot = await repository_reads.do(flight_key, load)
+        REPOSITORY_READS.labels(method, "coalesced" if coalesced else "query").inc()
+        if not coalesced or snapshot is None:
+            return loaded
+
+        instance = self.model(**snapshot)
+        make_transient_to_detached(instance)
+        return await self.session.merge(instance, load=False)
+
     def _build_filters(self, filters: dict[str, Any]) -> list:
         conditions = []
         for field, value in filters.items():
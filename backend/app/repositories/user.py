@@ -1,10 +1,15 @@
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import delete
-from sqlmodel import select
+from sqlalchemy import Select, delete
+from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
+from app.core.metrics import PASSWORD_REHASHES
+from app.core.security import (
+    get_password_hash_async,
+    verify_and_update_password_async,
+)
 from app.models.user import User
 from app.repositories.base import BaseRepository
 from app.schemas.user import UserCreate, UserUpdate
@@ -16,7 +21,8 @@ class UserRepository(BaseRepository[User]):
 
     async def create(self, user: UserCreate) -> User:
         db_obj = self.model.model_validate(
-            user, update={"hashed_password": get_password_hash(user.password)}
+            user,
+            update={"hashed_password": await get_password_hash_async(user.password)},
         )
         self.session.add(db_obj)
         await self.session.commit()
@@ -28,7 +34,7 @@ class UserRepository(BaseRepository[User]):
         extra_data = {}
         if "password" in user_data:
             password = user_data["password"]
-            hashed_password = get_password_hash(password)
+            hashed_password = await get_password_hash_async(password)
             extra_data["hashed_password"] = hashed_password
         db_user.sqlmodel_update(user_data, update=extra_data)
         self.session.add(db_user)
@@ -38,13 +44,11 @@ class UserRepository(BaseRepository[User]):
 
     async def get_by_email(self, email: str) -> User | None:
         query = select(self.model).where(self.model.email == email)
-        result = await self.session.exec(query)
-        return result.one_or_none()
+        return await self._get_one_coalesced("get_by_email", email, query)
 
-    async def get_by_id(self, id: UUID) -> User | None:
+    async def get_by_id(self, id: UUID | str) -> User | None:
         query = select(self.model).where(self.model.id == id)
-        result = await self.session.exec(query)
-        return result.one_or_none()
+        return await self._get_one_coalesced("get_by_id", id, query)
 
     async def list(
         self, skip: int | None = None, limit: int | None = None
@@ -57,6 +61,18 @@ class UserRepository(BaseRepository[User]):
         result = await self.session.exec(query)
         return list(result.all())
 
+    def list_columns_statement(
+        self, schema: type[SQLModel], skip: int | None = None, limit: int | None = None
+    ) -> Select[Any]:
+        """Запрос только колонок, нужных схеме ответа, для потоковой выдачи"""
+        columns = [getattr(self.model, name) for name in schema.model_fields]
+        query = select(*columns)
+        if skip is not None:
+            query = query.offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
     async def delete(self, id: UUID) -> None:
         query = delete(self.model).where(self.model.id == id)  # type: ignore
         await self.session.exec(query)  # type: ignore
@@ -65,8 +81,17 @@ class UserRepository(BaseRepository[User]):
     async def authenticate(self, email: str, password: str) -> User | None:
         """Асинхронная аутентификация пользователя"""
         db_user = await self.get_by_email(email=email)
-        if not db_user:
-            return None
-        if not verify_password(password, db_user.hashed_password):
+        hashed_password = db_user.hashed_password if db_user else None
+        valid, new_hash = await verify_and_update_password_async(
+            password, hashed_password
+        )
+        if not valid or db_user is None:
             return None
+        if new_hash:
+            # Хэш с прежней схемой или параметрами пересчитывается при входе
+            db_user.hashed_password = new_hash
+            self.session.add(db_user)
+            await self.session.commit()
+            await self.session.refresh(db_user)
+            PASSWORD_REHASHES.inc()
         return db_user
@@ -1,13 +1,26 @@
 from sqlmodel import Field, SQLModel
 
+from app.schemas.user import UserPublic
+
 
 class Token(SQLModel):
     access_token: str
+    refresh_token: str | None = None
     token_type: str = "bearer"
 
 
 class TokenPayload(SQLModel):
     sub: str | None = None
+    exp: int | None = None
+    jti: str | None = None
+    type: str = "access"
+    # Данные пользователя для проверки токена без обращения к базе
+    user: UserPublic | None = None
+    ver: int | None = None
+
+
+class RefreshTokenRequest(SQLModel):
+    refresh_token: str
 
 
 class NewPassword(SQLModel):
@@ -0,0 +1,12 @@
+from sqlmodel import SQLModel
+
+
+class CeleryQueue(SQLModel):
+    name: str
+    messages: int
+
+
+class CeleryQueuesPublic(SQLModel):
+    data: list[CeleryQueue]
+    # Полученные воркерами, но еще не подтвержденные задачи всех очередей
+    unacked: int
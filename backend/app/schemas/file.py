@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel
+
+
+# Загруженный файл, id используется для скачивания
+class StoredFilePublic(SQLModel):
+    id: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    url: str
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlmodel import SQLModel
+
+
+class QueryProfile(SQLModel):
+    fingerprint: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow_count: int
+    n_plus_one_count: int
+
+
+class QueryProfilesPublic(SQLModel):
+    since: datetime
+    pid: int
+    data: list[QueryProfile]
@@ -59,6 +59,13 @@ class UsersPublic(SQLModel):
     count: int
 
 
+# Состояние задачи массового импорта пользователей
+class UserImportStatus(SQLModel):
+    task_id: str
+    state: str
+    progress: dict[str, int] | None = None
+
+
 # Схема для чтения данных пользователя
 class UserRead(UserBase):
     id: UUID
@@ -0,0 +1,123 @@
+import json
+from contextlib import closing
+from datetime import datetime, timedelta
+from itertools import batched
+
+import psycopg2
+from redis import Redis
+
+from app.core.cache import get_namespace_key, get_value_key
+from app.core.config import settings
+from app.db.session import get_sync_dsn
+
+# Задачи Celery синхронные, поэтому клиент Redis здесь тоже синхронный
+redis = Redis.from_url(settings.REDIS_URL)
+
+SERVERS_KEY = "active_websocket_servers"
+SESSIONS_KEY = "websocket_sessions"
+RESULT_KEY_PATTERNS = ("celery-task-meta-*", "celery-taskset-meta-*")
+
+
+def is_server_alive(data: bytes, deadline: datetime) -> bool:
+    """Сервер жив, если обновлял запись о себе после deadline"""
+    try:
+        server = json.loads(data)
+        updated_at = server.get("updated_at") or server["started_at"]
+        return datetime.fromisoformat(updated_at) >= deadline
+    except (ValueError, KeyError, TypeError):
+        return False
+
+
+def reap_websocket_sessions() -> dict[str, int]:
+    """
+    Удаляет упавшие WebSocket серверы и сессии, оставшиеся от них.
+
+    Хэши обходятся через HSCAN пачками, чтобы не блокировать Redis
+    и не загружать все сессии в память.
+    """
+    batch_size = settings.MAINTENANCE_SCAN_BATCH_SIZE
+    deadline = datetime.now() - timedelta(seconds=settings.WEBSOCKET_SERVER_TTL)
+
+    alive: set[str] = set()
+    dead: list[bytes] = []
+    for server_id, data in redis.hscan_iter(SERVERS_KEY, count=batch_size):
+        if is_server_alive(data, deadline):
+            alive.add(server_id.decode())
+        else:
+            dead.append(server_id)
+    if dead:
+        redis.hdel(SERVERS_KEY, *dead)  # type: ignore
+
+    removed = 0
+    removed_servers = {server_id.decode() for server_id in dead}
+    sessions = redis.hscan_iter(SESSIONS_KEY, count=batch_size)
+    for batch in batched(sessions, batch_size):
+        candidates = []
+        for client_id, data in batch:
+            try:
+                server_id = json.loads(data).get("server_id")
+            except ValueError:
+                server_id = None
+            if server_id not in alive:
+                candidates.append((client_id, server_id))
+
+        # Сервер мог зарегистрироваться после чтения списка серверов,
+        # поэтому незнакомые серверы перепроверяются перед удалением сессий
+        unknown = sorted(
+            {server_id for _, server_id in candidates if server_id} - removed_servers
+        )
+        if unknown:
+            servers: list[bytes | None] = redis.hmget(SERVERS_KEY, unknown)  # type: ignore
+            for server_id, data in zip(unknown, servers, strict=True):
+                if data is not None and is_server_alive(data, deadline):
+                    alive.add(server_id)
+
+        stale = [
+            client_id for client_id, server_id in candidates if server_id not in alive
+        ]
+        if stale:
+            removed += redis.hdel(SESSIONS_KEY, *stale)  # type: ignore
+
+    return {"servers_removed": len(dead), "sessions_removed": removed}
+
+
+def refresh_user_count() -> dict[str, int]:
+    """Пересчитывает число пользователей для списка пользователей"""
+    with (
+        closing(psycopg2.connect(get_sync_dsn())) as connection,
+        connection.cursor() as cursor,
+    ):
+        cursor.execute('SELECT count(*) FROM "user"')
+        (count,) = cursor.fetchone()
+
+    if settings.CACHE_ENABLED:
+        key = get_value_key("users", "count")
+        with redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps(count), ex=settings.USER_COUNT_CACHE_TTL)
+            pipe.sadd(get_namespace_key("users"), key)
+            pipe.expire(get_namespace_key("users"), settings.CACHE_MAX_TTL)
+            pipe.execute()
+    return {"users": count}
+
+
+def prune_task_results(client: Redis) -> dict[str, int]:
+    """
+    Назначает время жизни результатам задач, сохраненным без него
+    (до включения result_expires или задачами с expires=None).
+    """
+    expired = 0
+    batch_size = settings.MAINTENANCE_SCAN_BATCH_SIZE
+    for pattern in RESULT_KEY_PATTERNS:
+        keys = client.scan_iter(match=pattern, count=batch_size)
+        for batch in batched(keys, batch_size):
+            with client.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.ttl(key)
+                ttls = pipe.execute()
+            with client.pipeline(transaction=False) as pipe:
+                for key, ttl in zip(batch, ttls, strict=True):
+                    if ttl == -1:
+                        pipe.expire(key, settings.CELERY_RESULT_EXPIRES)
+                        expired += 1
+                pipe.execute()
+    return {"results_expired": expired}
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import os
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+from pathlib import Path
+from typing import Any, Literal
+from uuid import uuid4
+
+import psycopg2
+from pydantic import ValidationError
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.session import async_engine, get_sync_dsn
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+TransferFormat = Literal["csv", "ndjson"]
+
+# Поля пользователя в порядке колонок COPY и CSV экспорта
+IMPORT_COLUMNS = (
+    "id",
+    "email",
+    "first_name",
+    "last_name",
+    "full_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "hashed_password",
+)
+EXPORT_COLUMNS = IMPORT_COLUMNS[:-1]
+
+
+def get_import_dir() -> Path:
+    path = Path(settings.LOCAL_STORAGE_PATH) / "imports"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def read_rows(path: Path, fmt: TransferFormat) -> Iterator[dict[str, Any]]:
+    """Построчно читает файл импорта, не загружая его целиком"""
+    with path.open(newline="", encoding="utf-8") as file:
+        if fmt == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Пустая запись не пройдет валидацию и попадет в ошибки
+                    yield {}
+
+
+def import_users(
+    path: Path,
+    fmt: TransferFormat,
+    on_progress: Callable[[dict[str, int]], None] | None = None,
+) -> dict[str, int]:
+    """
+    Импортирует пользователей пачками через COPY во временную таблицу
+    и INSERT ... ON CONFLICT, существующие email пропускаются.
+
+    Пароли хэшируются параллельно: bcrypt отпускает GIL.
+    """
+    stats = {"processed": 0, "created": 0, "skipped": 0, "errors": 0}
+    rows = read_rows(path, fmt)
+    columns = ", ".join(IMPORT_COLUMNS)
+
+    with (
+        ThreadPoolExecutor(max_workers=os.cpu_count()) as executor,
+        closing(psycopg2.connect(get_sync_dsn())) as connection,
+        connection.cursor() as cursor,
+    ):
+        cursor.execute(
+            'CREATE TEMP TABLE user_import (LIKE "user") ON COMMIT DELETE ROWS'
+        )
+        while batch := list(islice(rows, settings.USER_IMPORT_BATCH_SIZE)):
+            users: list[UserCreate] = []
+            for row in batch:
+                try:
+                    users.append(
+                        UserCreate.model_validate(
+                            {key: value for key, value in row.items() if value != ""}
+                        )
+                    )
+                except (ValidationError, AttributeError):
+                    stats["errors"] += 1
+            hashes = executor.map(get_password_hash, [user.password for user in users])
+
+            # Пустое значение без кавычек COPY читает как NULL
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, quoting=csv.QUOTE_STRINGS)
+            for user, hashed_password in zip(users, hashes, strict=True):
+                writer.writerow(
+                    (
+                        uuid4(),
+                        user.email,
+                        user.first_name,
+                        user.last_name,
+                        user.full_name,
+                        user.is_active,
+                        user.is_staff,
+                        user.is_superuser,
+                        hashed_password,
+                    )
+                )
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY user_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(
+                f'INSERT INTO "user" ({columns}) SELECT {columns} FROM user_import '
+                "ON CONFLICT (email) DO NOTHING"
+            )
+            connection.commit()
+
+            stats["processed"] += len(batch)
+            stats["created"] += cursor.rowcount
+            stats["skipped"] += len(users) - cursor.rowcount
+            if on_progress is not None:
+                on_progress(stats)
+
+    return stats
+
+
+async def export_users(fmt: TransferFormat) -> AsyncIterator[str]:
+    """
+    Выгружает пользователей через серверный курсор.
+
+    Сессия открывается внутри генератора, так как ответ отдается уже
+    после выхода из зависимостей запроса.
+    """
+    statement = (
+        select(*(getattr(User, name) for name in EXPORT_COLUMNS))
+        .order_by(col(User.email))
+        .execution_options(yield_per=settings.USER_EXPORT_BATCH_SIZE)
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(EXPORT_COLUMNS)
+
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream(statement)
+        async for partition in result.partitions():
+            for row in partition:
+                if fmt == "csv":
+                    writer.writerow(row)
+                else:
+                    record = dict(zip(EXPORT_COLUMNS, row, strict=True))
+                    record["id"] = str(record["id"])
+                    buffer.write(json.dumps(record) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
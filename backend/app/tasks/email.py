@@ -1,20 +1,43 @@
 import logging
 from typing import Any
 
+from celery import Task
+from celery.signals import worker_init, worker_process_shutdown
+from starlette.concurrency import run_in_threadpool
+
 from app.core.celery_app import celery_app
+from app.core.config import settings
 from app.utils.email import (
     EmailData,
     generate_new_account_email,
     generate_reset_password_email,
     generate_test_email,
     send_email,
+    send_emails,
+    smtp_pool,
+    warm_email_templates,
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Отдельные письма (восстановление пароля, новый аккаунт) подтверждаются
+# при получении, а не после выполнения, как остальные задачи. При
+# CELERY_ACKS_LATE неподтвержденную задачу упавшего воркера Redis выдает
+# повторно только через CELERY_VISIBILITY_TIMEOUT - общий для брокера
+# и рассчитанный на долгий импорт (6 часов), а письмо со ссылкой для сброса
+# пароля через несколько часов бесполезно. Цена - письмо, которое
+# отправлялось в момент падения воркера, теряется, и пользователь
+# запрашивает его повторно. Массовые рассылки и импорт остаются с поздним
+# подтверждением: для них повтор через несколько часов лучше потери
+TRANSACTIONAL_EMAIL = {
+    "ignore_result": True,
+    "acks_late": False,
+    "reject_on_worker_lost": False,
+}
+
 
-@celery_app.task
+@celery_app.task(**TRANSACTIONAL_EMAIL)
 def send_test_email_task(email_to: str) -> dict[str, Any]:
     """
     Задача Celery для отправки тестового письма
@@ -28,7 +51,7 @@ def send_test_email_task(email_to: str) -> dict[str, Any]:
     return {"email": email_to, "message": "Test email sent"}
 
 
-@celery_app.task
+@celery_app.task(**TRANSACTIONAL_EMAIL)
 def send_reset_password_email_task(
     email_to: str, email: str, token: str
 ) -> dict[str, Any]:
@@ -46,7 +69,7 @@ def send_reset_password_email_task(
     return {"email": email_to, "message": "Reset password email sent"}
 
 
-@celery_app.task
+@celery_app.task(**TRANSACTIONAL_EMAIL)
 def send_new_account_email_task(
     email_to: str, username: str, password: str
 ) -> dict[str, Any]:
@@ -64,7 +87,7 @@ def send_new_account_email_task(
     return {"email": email_to, "message": "New account email sent"}
 
 
-@celery_app.task
+@celery_app.task(**TRANSACTIONAL_EMAIL)
 def send_email_task(
     *,
     email_to: str,
@@ -80,3 +103,57 @@ def send_email_task(
         html_content=html_content,
     )
     return {"email": email_to, "message": "Email sent"}
+
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
+def send_email_batch_task(self: Task, messages: list[dict[str, str]]) -> dict[str, Any]:
+    """
+    Задача Celery для отправки пачки писем через одно SMTP соединение.
+
+    Повторно отправляются только письма, которые не удалось отправить,
+    после исчерпания попыток они возвращаются в отчете.
+    """
+    results = send_emails(messages)
+    failed = [
+        message
+        for message, result in zip(messages, results, strict=True)
+        if not result.success
+    ]
+    if failed and self.request.retries < self.max_retries:
+        logger.warning(
+            f"Не удалось отправить {len(failed)} из {len(messages)} писем, повтор"
+        )
+        raise self.retry(kwargs={"messages": failed})
+    return {
+        "sent": len(messages) - len(failed),
+        "failed": [
+            {"email": result.email_to, "error": result.error}
+            for result in results
+            if not result.success
+        ],
+    }
+
+
+@worker_init.connect
+def compile_email_templates(**_: Any) -> None:
+    # Процессы пула создаются после worker_init и наследуют готовые шаблоны
+    warm_email_templates()
+
+
+@worker_process_shutdown.connect
+def close_smtp_connections(**_: Any) -> None:
+    smtp_pool.close()
+
+
+async def dispatch_email(task: Task, **kwargs: Any) -> None:
+    """
+    Отправляет письмо, не блокируя обработчик запроса.
+
+    В режиме celery задача ставится в очередь, в режиме inline выполняется
+    в пуле потоков через SMTP_HOST (например, локальный mailcatcher в тестах).
+    Постановка в очередь тоже сетевой вызов, поэтому делается вне event loop.
+    """
+    if settings.EMAIL_DISPATCH == "inline":
+        await run_in_threadpool(task, **kwargs)
+    else:
+        await run_in_threadpool(task.delay, **kwargs)
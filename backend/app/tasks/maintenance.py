@@ -0,0 +1,83 @@
+import logging
+import time
+from collections.abc import Callable
+
+from redis.exceptions import LockError
+
+from app.core.celery_app import celery_app
+from app.core.metrics import MAINTENANCE_JOB_RUNS, MAINTENANCE_JOB_SECONDS
+from app.services.maintenance import (
+    prune_task_results,
+    reap_websocket_sessions,
+    redis,
+    refresh_user_count,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "maintenance_lock:"
+
+
+def run_job(name: str, job: Callable[[], dict[str, int]], timeout: int) -> None:
+    """
+    Выполняет задачу обслуживания, если ее не выполняет другой воркер.
+
+    Блокировка снимается по истечении timeout, даже если воркер упал.
+    Если задача выполнялась дольше, блокировку уже мог взять другой
+    воркер, и снимается она только по токену владельца.
+    """
+    lock = redis.lock(f"{LOCK_PREFIX}{name}", timeout=timeout, blocking=False)
+    if not lock.acquire():
+        MAINTENANCE_JOB_RUNS.labels(name, "skipped").inc()
+        logger.info(f"Задача обслуживания {name} уже выполняется, пропускаем")
+        return
+
+    started = time.perf_counter()
+    try:
+        stats = job()
+    except Exception:
+        MAINTENANCE_JOB_RUNS.labels(name, "error").inc()
+        raise
+    finally:
+        MAINTENANCE_JOB_SECONDS.labels(name).observe(time.perf_counter() - started)
+        try:
+            lock.release()
+        except LockError:
+            logger.warning(
+                f"Блокировка задачи обслуживания {name} истекла до ее завершения"
+            )
+
+    MAINTENANCE_JOB_RUNS.labels(name, "success").inc()
+    logger.info(
+        f"Задача обслуживания {name} выполнена за "
+        f"{time.perf_counter() - started:.2f}s: {stats}"
+    )
+
+
+@celery_app.task(ignore_result=True)
+def reap_websocket_sessions_task() -> None:
+    """
+    Задача Celery для удаления сессий упавших WebSocket серверов
+    """
+    run_job("reap_websocket_sessions", reap_websocket_sessions, timeout=10 * 60)
+
+
+@celery_app.task(ignore_result=True)
+def refresh_user_count_task() -> None:
+    """
+    Задача Celery для пересчета закэшированного числа пользователей
+    """
+    run_job("refresh_user_count", refresh_user_count, timeout=10 * 60)
+
+
+@celery_app.task(ignore_result=True)
+def prune_task_results_task() -> None:
+    """
+    Задача Celery для назначения времени жизни результатам задач
+    """
+    run_job(
+        "prune_task_results",
+        lambda: prune_task_results(celery_app.backend.client),
+        timeout=60 * 60,
+    )
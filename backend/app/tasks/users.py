@@ -0,0 +1,34 @@
+import logging
+from pathlib import Path
+from typing import Any
+
+from celery import Task
+
+from app.core.celery_app import celery_app
+from app.services.maintenance import refresh_user_count
+from app.services.user_transfer import TransferFormat, import_users
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def import_users_task(self: Task, path: str, fmt: TransferFormat) -> dict[str, Any]:
+    """
+    Задача Celery для массового импорта пользователей из загруженного файла
+    """
+    import_path = Path(path)
+    try:
+        stats = import_users(
+            import_path,
+            fmt,
+            on_progress=lambda progress: self.update_state(
+                state="PROGRESS", meta=progress
+            ),
+        )
+    finally:
+        import_path.unlink(missing_ok=True)
+    logger.info(f"Импорт пользователей завершен: {stats}")
+    if stats["created"]:
+        refresh_user_count()
+    return stats
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.api.v1.routes.login import login_account_backoff, login_ip_backoff
+from app.core.config import settings
+from app.core.rate_limit import reset_failures
+from app.core.tokens import revoke_user_sessions
+
+pytestmark = pytest.mark.anyio
+
+# ASGITransport передает этот адрес как IP клиента
+CLIENT_IP = "127.0.0.1"
+
+
+async def login(client: AsyncClient, password: str) -> int:
+    response = await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": settings.FIRST_SUPERUSER, "password": password},
+    )
+    return response.status_code
+
+
+async def test_concurrent_correct_logins_succeed(client: AsyncClient) -> None:
+    await reset_failures(login_account_backoff, settings.FIRST_SUPERUSER)
+    await reset_failures(login_ip_backoff, CLIENT_IP)
+    # Больше бесплатных попыток и для аккаунта, и для IP
+    attempts = settings.LOGIN_IP_FREE_ATTEMPTS + settings.LOGIN_ACCOUNT_FREE_ATTEMPTS
+
+    results = await asyncio.gather(
+        *(login(client, settings.FIRST_SUPERUSER_PASSWORD) for _ in range(attempts))
+    )
+
+    assert results == [200] * attempts
+
+
+async def test_failed_logins_lock_account(client: AsyncClient) -> None:
+    await reset_failures(login_account_backoff, settings.FIRST_SUPERUSER)
+    await reset_failures(login_ip_backoff, CLIENT_IP)
+
+    for _ in range(settings.LOGIN_ACCOUNT_FREE_ATTEMPTS + 1):
+        assert await login(client, "wrong-password") == 400
+    assert await login(client, settings.FIRST_SUPERUSER_PASSWORD) == 429
+
+    await reset_failures(login_account_backoff, settings.FIRST_SUPERUSER)
+    await reset_failures(login_ip_backoff, CLIENT_IP)
+
+
+async def get_tokens(client: AsyncClient) -> dict[str, str]:
+    response = await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={
+            "username": settings.FIRST_SUPERUSER,
+            "password": settings.FIRST_SUPERUSER_PASSWORD,
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def refresh(client: AsyncClient, refresh_token: str) -> int:
+    response = await client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": refresh_token},
+    )
+    return response.status_code
+
+
+async def test_profile_update_keeps_sessions(client: AsyncClient) -> None:
+    tokens = await get_tokens(client)
+    other_device = await get_tokens(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    user = await client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+
+    response = await client.patch(
+        f"{settings.API_V1_STR}/users/me",
+        headers=headers,
+        json={"full_name": user.json()["full_name"]},
+    )
+    assert response.status_code == 200
+
+    assert await refresh(client, other_device["refresh_token"]) == 200
+
+
+async def test_revoked_sessions_reject_refresh(client: AsyncClient) -> None:
+    tokens = await get_tokens(client)
+    user = await client.post(
+        f"{settings.API_V1_STR}/login/test-token",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+
+    await revoke_user_sessions(user.json()["id"])
+
+    assert await refresh(client, tokens["refresh_token"]) == 403
@@ -0,0 +1,23 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+
+
+# Клиенты Redis и пул базы создаются при импорте и привязаны к циклу
+# событий, поэтому все тесты выполняются в одном цикле
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+# Сессионная асинхронная фикстура удерживает этот цикл между тестами,
+# поэтому подключается ко всем тестам, даже не использующим клиента
+@pytest.fixture(scope="session", autouse=True)
+async def client() -> AsyncGenerator[AsyncClient]:
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
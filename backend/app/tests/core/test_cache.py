@@ -0,0 +1,66 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.cache import cached, invalidate, redis
+from app.core.config import settings
+from app.schemas.user import UserPublic
+
+pytestmark = pytest.mark.anyio
+
+
+def make_user(is_superuser: bool) -> UserPublic:
+    return UserPublic(
+        id=uuid4(), email=f"{uuid4().hex}@example.com", is_superuser=is_superuser
+    )
+
+
+async def test_role_scope_separates_superuser_and_user() -> None:
+    calls: list[bool] = []
+
+    @cached("test_role_scope", scope="role")
+    async def read_role(current_user: UserPublic) -> dict[str, bool]:
+        calls.append(current_user.is_superuser)
+        return {"is_superuser": current_user.is_superuser}
+
+    await invalidate("test_role_scope")
+    superuser = await read_role(current_user=make_user(is_superuser=True))
+    user = await read_role(current_user=make_user(is_superuser=False))
+    # Другой пользователь той же роли получает запись из кэша
+    other_user = await read_role(current_user=make_user(is_superuser=False))
+
+    assert superuser.body == b'{"is_superuser":true}'
+    assert user.body == b'{"is_superuser":false}'
+    assert other_user.headers["X-Cache"] == "HIT"
+    assert other_user.body == user.body
+    assert calls == [True, False]
+    await invalidate("test_role_scope")
+
+
+async def test_role_scope_requires_current_user() -> None:
+    @cached("test_role_scope", scope="role")
+    async def read_anything(limit: int = 10) -> list[int]:
+        return [limit]
+
+    with pytest.raises(TypeError):
+        await read_anything(limit=10)
+
+
+async def test_read_users_cached_per_role(client: AsyncClient) -> None:
+    response = await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={
+            "username": settings.FIRST_SUPERUSER,
+            "password": settings.FIRST_SUPERUSER_PASSWORD,
+        },
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await invalidate("users")
+
+    response = await client.get(f"{settings.API_V1_STR}/users/", headers=headers)
+
+    assert response.status_code == 200
+    keys = [key async for key in redis.scan_iter("cache:users:read_users:*")]
+    assert keys
+    assert all(b":superuser:" in key for key in keys)
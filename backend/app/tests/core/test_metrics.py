@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.session import async_engine
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_query_clears_start_time() -> None:
+    async with async_engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            await conn.execute(text("SELECT 1 / 0"))
+        await conn.rollback()
+        await conn.execute(text("SELECT 1"))
+
+        info = (await conn.get_raw_connection()).info
+        assert info["query_started"] == []
@@ -1,10 +1,15 @@
 import logging
+import queue
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import emails  # type: ignore
-from jinja2 import Template
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from app.core.config import settings
 
@@ -18,12 +23,116 @@ class EmailData:
     subject: str
 
 
+EMAIL_TEMPLATES_DIR = Path(__file__).parent.parent / "email-templates" / "build"
+
+# Скомпилированные шаблоны хранятся в LRU окружения, байткод - на диске,
+# чтобы новые процессы воркера не компилировали шаблоны заново
+template_env = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+    bytecode_cache=FileSystemBytecodeCache(),
+    cache_size=settings.EMAIL_TEMPLATES_CACHE_SIZE,
+    auto_reload=settings.ENVIRONMENT == "local",
+)
+
+
+def warm_email_templates() -> None:
+    """Компилирует все шаблоны писем заранее, например при старте воркера"""
+    for template_name in template_env.list_templates(extensions=["html"]):
+        template_env.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
+    return template_env.get_template(template_name).render(context)
+
+
+class SMTPConnectionPool:
+    """
+    Пул SMTP соединений процесса.
+
+    Соединение переиспользуется между письмами, пока не простаивает дольше
+    SMTP_IDLE_TIMEOUT. При обрыве SMTPBackend переподключается один раз,
+    после ошибки отправки соединение закрывается и создается заново.
+    """
+
+    def __init__(self, size: int, idle_timeout: float) -> None:
+        self.idle_timeout = idle_timeout
+        self._idle: queue.LifoQueue[tuple[SMTPBackend, float]] = queue.LifoQueue(
+            maxsize=size
+        )
+
+    @staticmethod
+    def _create() -> SMTPBackend:
+        smtp_options: dict[str, Any] = {
+            "host": settings.SMTP_HOST,
+            "port": settings.SMTP_PORT,
+        }
+        if settings.SMTP_TLS:
+            smtp_options["tls"] = True
+        elif settings.SMTP_SSL:
+            smtp_options["ssl"] = True
+        if settings.SMTP_USER:
+            smtp_options["user"] = settings.SMTP_USER
+        if settings.SMTP_PASSWORD:
+            smtp_options["password"] = settings.SMTP_PASSWORD
+        return SMTPBackend(**smtp_options)
+
+    @contextmanager
+    def connection(self) -> Iterator[SMTPBackend]:
+        backend = None
+        while backend is None:
+            try:
+                candidate, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                backend = self._create()
+                break
+            if time.monotonic() - released_at > self.idle_timeout:
+                candidate.close()
+            else:
+                backend = candidate
+
+        healthy = True
+        try:
+            yield backend
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            if not healthy or backend._client is None:
+                backend.close()
+            else:
+                try:
+                    self._idle.put_nowait((backend, time.monotonic()))
+                except queue.Full:
+                    backend.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                backend, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            backend.close()
+
+
+smtp_pool = SMTPConnectionPool(
+    size=settings.SMTP_POOL_SIZE, idle_timeout=settings.SMTP_IDLE_TIMEOUT
+)
+
+
+@dataclass
+class EmailResult:
+    email_to: str
+    success: bool
+    error: str | None = None
+
+
+def _send(backend: SMTPBackend, email_to: str, subject: str, html_content: str) -> Any:
+    message = emails.Message(
+        subject=subject,
+        html=html_content,
+        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    )
+    return message.send(to=email_to, smtp=backend)
 
 
 def send_email(
@@ -33,24 +142,47 @@ def send_email(
     html_content: str = "",
 ) -> None:
     assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    with smtp_pool.connection() as backend:
+        response = _send(backend, email_to, subject, html_content)
+        if not response.success:
+            # Соединение могло остаться в неизвестном состоянии
+            backend.close()
     logger.info(f"send email result: {response}")
 
 
+def send_emails(messages: list[dict[str, str]]) -> list[EmailResult]:
+    """
+    Отправляет письма через одно SMTP соединение.
+
+    Каждое письмо - словарь с email_to, subject и html_content, ошибка
+    отправки одного письма не прерывает отправку остальных.
+    """
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    results = []
+    with smtp_pool.connection() as backend:
+        for message in messages:
+            try:
+                response = _send(
+                    backend,
+                    message["email_to"],
+                    message.get("subject", ""),
+                    message.get("html_content", ""),
+                )
+            except Exception as e:
+                response = None
+                error: str | None = str(e)
+            else:
+                error = None if response.success else str(response.error)
+            if error is not None:
+                backend.close()
+            results.append(
+                EmailResult(
+                    email_to=message["email_to"], success=error is None, error=error
+                )
+            )
+    return results
+
+
 def generate_test_email(email_to: str) -> EmailData:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Test email"
@@ -0,0 +1,119 @@
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# События разбора: заголовки части, кусок ее данных, конец части
+PartEvent = tuple[str, bytes | dict[bytes, bytes]]
+
+
+@dataclass
+class FilePart:
+    filename: str
+    content_type: str
+    chunks: AsyncIterator[bytes]
+
+
+class MultipartReader:
+    """
+    Потоковый разбор multipart/form-data.
+
+    Данные частей отдаются по мере поступления тела запроса, без
+    SpooledTemporaryFile, который использует request.form().
+    """
+
+    def __init__(self, boundary: bytes) -> None:
+        self._events: list[PartEvent] = []
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        self._events.append(("headers", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self) -> None:
+        self._events.append(("end", b""))
+
+    def feed(self, chunk: bytes) -> list[PartEvent]:
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise ValueError(f"Malformed multipart body: {e}") from e
+        events, self._events = self._events, []
+        return events
+
+
+async def iter_events(
+    content_type: str, body: AsyncIterator[bytes]
+) -> AsyncIterator[PartEvent]:
+    media_type, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if media_type != b"multipart/form-data" or not boundary:
+        raise ValueError("Expected multipart/form-data body")
+    reader = MultipartReader(boundary)
+    async for chunk in body:
+        for event in reader.feed(chunk):
+            yield event
+
+
+async def stream_file_field(
+    content_type: str, body: AsyncIterator[bytes], field: str
+) -> FilePart | None:
+    """
+    Находит в теле запроса файловое поле field и возвращает его данные
+    потоком. Остальные части пропускаются, тело после файла не читается.
+
+    None - если поля нет, ValueError - если тело не разбирается.
+    """
+    events = aiter(iter_events(content_type, body))
+    async for kind, value in events:
+        if kind != "headers" or not isinstance(value, dict):
+            continue
+        _, options = parse_options_header(value.get(b"content-disposition", b""))
+        if options.get(b"name") != field.encode() or b"filename" not in options:
+            continue
+
+        async def chunks() -> AsyncIterator[bytes]:
+            async for kind, data in events:
+                if kind == "end":
+                    return
+                if isinstance(data, bytes) and data:
+                    yield data
+            raise ValueError("Multipart body ended before the file part")
+
+        return FilePart(
+            filename=options[b"filename"].decode(errors="replace"),
+            content_type=value.get(b"content-type", b"").decode(errors="replace"),
+            chunks=chunks(),
+        )
+    return None
@@ -2,8 +2,12 @@ import io
 import logging
 import os
 import uuid
+from collections.abc import AsyncIterable, AsyncIterator
 from pathlib import Path
-from typing import BinaryIO, Protocol
+from typing import Any, BinaryIO, Protocol
+
+from anyio import open_file
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
 
@@ -20,6 +24,12 @@ except ImportError:
     logger.warning("Boto3 library not installed. S3 storage will not be available.")
 
 
+# Суффикс временного файла, пока LocalFileStorage.save_stream его пишет
+PARTIAL_SUFFIX = ".part"
+# Минимальный размер части multipart upload в S3, кроме последней
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
 class FileStorage(Protocol):
     """Протокол для хранилища файлов"""
 
@@ -39,6 +49,22 @@ class FileStorage(Protocol):
         """Возвращает URL для доступа к файлу"""
         pass
 
+    async def save_stream(self, chunks: AsyncIterable[bytes], file_path: str) -> str:
+        """
+        Сохраняет файл по частям, не собирая его в памяти.
+
+        Если поток прерван исключением, частично записанный файл удаляется.
+        """
+        pass
+
+    async def get_size(self, file_path: str) -> int | None:
+        """Размер файла в байтах или None, если файла нет"""
+        pass
+
+    def iter_range(self, file_path: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Отдает байты файла с start по end включительно частями"""
+        ...
+
 
 class LocalFileStorage(FileStorage):
     """Реализация хранилища файлов на локальной файловой системе"""
@@ -111,6 +137,40 @@ class LocalFileStorage(FileStorage):
         # Предполагается, что будет настроен статический маршрут для доступа к файлам
         return f"/static/{file_path}"
 
+    async def save_stream(self, chunks: AsyncIterable[bytes], file_path: str) -> str:
+        """Пишет файл во временный и переименовывает после успешной записи"""
+        full_path = self.base_path / file_path
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        part_path = full_path.with_name(f"{full_path.name}{PARTIAL_SUFFIX}")
+        try:
+            async with await open_file(part_path, "wb") as file:
+                async for chunk in chunks:
+                    await file.write(chunk)
+            os.replace(part_path, full_path)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+        return str(file_path)
+
+    async def get_size(self, file_path: str) -> int | None:
+        try:
+            return (self.base_path / file_path).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    async def iter_range(
+        self, file_path: str, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        remaining = end - start + 1
+        async with await open_file(self.base_path / file_path, "rb") as file:
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(settings.STORAGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
 
 class S3FileStorage(FileStorage):
     """Реализация хранилища файлов на S3"""
@@ -183,6 +243,84 @@ class S3FileStorage(FileStorage):
         region_part = f"-{self.region}" if self.region else ""
         return f"https://{self.bucket_name}.s3{region_part}.amazonaws.com/{file_path}"
 
+    async def save_stream(self, chunks: AsyncIterable[bytes], file_path: str) -> str:
+        """
+        Загружает файл через multipart upload: части не меньше 5 MiB
+        (минимум S3 для всех частей, кроме последней) отправляются по мере
+        поступления данных.
+        """
+        upload = await run_in_threadpool(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=file_path,
+        )
+        upload_id = upload["UploadId"]
+        parts: list[dict[str, Any]] = []
+        buffer = bytearray()
+
+        async def upload_part() -> None:
+            response = await run_in_threadpool(
+                self.s3_client.upload_part,
+                Bucket=self.bucket_name,
+                Key=file_path,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=bytes(buffer),
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": len(parts) + 1})
+            buffer.clear()
+
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) >= S3_MIN_PART_SIZE:
+                    await upload_part()
+            if buffer or not parts:
+                await upload_part()
+            await run_in_threadpool(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=file_path,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await run_in_threadpool(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=file_path,
+                UploadId=upload_id,
+            )
+            raise
+        return file_path
+
+    async def get_size(self, file_path: str) -> int | None:
+        try:
+            response = await run_in_threadpool(
+                self.s3_client.head_object, Bucket=self.bucket_name, Key=file_path
+            )
+        except ClientError:
+            return None
+        return int(response["ContentLength"])
+
+    async def iter_range(
+        self, file_path: str, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        response = await run_in_threadpool(
+            self.s3_client.get_object,
+            Bucket=self.bucket_name,
+            Key=file_path,
+            Range=f"bytes={start}-{end}",
+        )
+        body = response["Body"]
+        try:
+            while chunk := await run_in_threadpool(
+                body.read, settings.STORAGE_CHUNK_SIZE
+            ):
+                yield chunk
+        finally:
+            body.close()
+
 
 class StorageFactory:
     """Фабрика для создания хранилища файлов в зависимости от настроек"""
@@ -221,3 +359,30 @@ async def save_uploaded_file(
     storage = get_storage()
     file_path = os.path.join(directory, filename)
     return await storage.save_file(file_content, file_path)
+
+
+def parse_range_header(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+
+    Возвращает (start, end) включительно или None, если заголовок не
+    поддерживается (несколько диапазонов, другие единицы, ошибка формата)
+    и нужно отдать файл целиком. Для недостижимого диапазона выбрасывает ValueError.
+    """
+    unit, _, ranges = header.partition("=")
+    first, _, last = ranges.strip().partition("-")
+    if unit.strip() != "bytes" or not (first or last):
+        return None
+    if not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        # bytes=-N: последние N байт
+        suffix = int(last)
+        if suffix <= 0:
+            raise ValueError(header)
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        raise ValueError(header)
+    return start, end
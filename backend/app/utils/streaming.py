@@ -0,0 +1,49 @@
+from collections.abc import AsyncIterator
+from typing import Any
+
+from pydantic import TypeAdapter
+from sqlalchemy import Select
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.responses import StreamingResponse
+
+from app.core.config import settings
+from app.db.session import async_engine
+
+
+async def stream_list(
+    statement: Select[Any], schema: type[SQLModel], count: int
+) -> AsyncIterator[bytes]:
+    """
+    Отдает {"count": ..., "data": [...]} частями по мере чтения курсора.
+
+    Каждая пачка строк валидируется схемой один раз и сразу кодируется
+    в JSON средствами pydantic-core, без промежуточных моделей ответа.
+    """
+    adapter = TypeAdapter(list[schema])  # type: ignore[valid-type]
+    statement = statement.execution_options(yield_per=settings.STREAMING_BATCH_SIZE)
+    yield b'{"count":%d,"data":[' % count
+
+    first = True
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream(statement)
+        async for partition in result.mappings().partitions():
+            items = adapter.dump_json(adapter.validate_python(partition))
+            # Убираем скобки списка, чтобы склеить пачки в один массив
+            yield (b"" if first else b",") + items[1:-1]
+            first = False
+
+    yield b"]}"
+
+
+def streaming_list_response(
+    statement: Select[Any], schema: type[SQLModel], count: int
+) -> StreamingResponse:
+    """
+    Потоковый ответ для списочных эндпоинтов.
+
+    statement должен выбирать колонки с именами полей схемы.
+    """
+    return StreamingResponse(
+        stream_list(statement, schema, count), media_type="application/json"
+    )
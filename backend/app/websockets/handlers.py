@@ -1,24 +1,33 @@
 import asyncio
 import json
 import logging
+import time
 import uuid
+import zlib
 from typing import Any, Protocol
 
-from redis.asyncio import Redis
-
 from app.core.config import settings
+from app.core.metrics import InstrumentedRedis
 
 # Настраиваем логирование
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Инициализация Redis
-redis = Redis.from_url(settings.REDIS_URL)
+redis = InstrumentedRedis.from_url(settings.REDIS_URL)
 
 # Хранилище состояний пользователей
 user_states: dict[str, Any] = {}
 
 
+def get_response_channel(key: str) -> str:
+    """Возвращает шард канала ответов для client_id или user_id"""
+    if settings.WEBSOCKET_RESPONSE_SHARDS <= 0:
+        return "websocket_responses"
+    shard = zlib.crc32(key.encode()) % settings.WEBSOCKET_RESPONSE_SHARDS
+    return f"websocket_responses:{shard}"
+
+
 class WebSocketHandler(Protocol):
     """Протокол для обработчиков WebSocket событий"""
 
@@ -65,8 +74,14 @@ class WebSocketMessageRouter:
 message_router = WebSocketMessageRouter()
 
 
-async def handle_message(client_id: str, message: str):
+async def handle_message(client_id: str, message: str, server_id: str | None = None):
     """Обработка сообщений от клиента"""
+    # Отвечаем напрямую серверу, получившему событие, иначе - в шард клиента
+    channel = (
+        f"websocket_server_{server_id}"
+        if server_id
+        else get_response_channel(client_id)
+    )
     try:
         data = json.loads(message)
         message_type = data.get("type", "unknown")
@@ -76,17 +91,24 @@ async def handle_message(client_id: str, message: str):
 
         # Отправляем ответ обратно через Redis
         await redis.publish(
-            "websocket_responses",
-            json.dumps({"client_id": client_id, "response": response}),
+            channel,
+            json.dumps(
+                {
+                    "client_id": client_id,
+                    "response": response,
+                    "published_at": time.time(),
+                }
+            ),
         )
 
     except json.JSONDecodeError:
         await redis.publish(
-            "websocket_responses",
+            channel,
             json.dumps(
                 {
                     "client_id": client_id,
                     "response": {"type": "error", "message": "Неверный формат JSON"},
+                    "published_at": time.time(),
                 }
             ),
         )
@@ -188,18 +210,25 @@ async def send_message_to_client(
             if server_id:
                 await redis.publish(
                     f"websocket_server_{server_id}",
-                    json.dumps({"client_id": client_id, "response": message}),
+                    json.dumps(
+                        {
+                            "client_id": client_id,
+                            "response": message,
+                            "published_at": time.time(),
+                        }
+                    ),
                 )
                 return True
 
-        # Если не знаем точного сервера или хотим разослать всем
+        # Если не знаем точного сервера, публикуем в шард клиента
         await redis.publish(
-            "websocket_responses",
+            get_response_channel(client_id),
             json.dumps(
                 {
                     "client_id": client_id,
                     "response": message,
                     "broadcast_if_missing": broadcast_if_missing,
+                    "published_at": time.time(),
                 }
             ),
         )
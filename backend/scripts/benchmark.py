@@ -0,0 +1,350 @@
+"""
+Нагрузочный тест API и WebSocket сервера.
+
+Запускается против уже поднятого окружения (например, `docker compose up`
+с локальными Postgres и Redis) и сохраняет результаты в JSON, чтобы
+сравнивать их между коммитами:
+
+    python scripts/benchmark.py \\
+        --api-url http://localhost:8000 --ws-url ws://localhost:8001 \\
+        --username admin@example.com --password changethis \\
+        --pid backend=12345 --output benchmarks
+
+    python scripts/benchmark.py ... --compare benchmarks/<предыдущий>.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+import websockets
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    duration: float
+    rps: float
+    latency_ms: dict[str, float]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Перцентили задержек в миллисекундах"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(quantile: float) -> float:
+        index = min(len(ordered) - 1, int(quantile * len(ordered)))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def run_http_scenario(
+    name: str,
+    request: Callable[[int], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int,
+) -> ScenarioResult:
+    """Выполняет total запросов в concurrency параллельных потоках"""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await request(index)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    return ScenarioResult(
+        name=name,
+        requests=total,
+        errors=errors,
+        duration=round(duration, 3),
+        rps=round(total / duration, 2),
+        latency_ms=summarize(latencies),
+    )
+
+
+async def run_websocket_scenario(
+    ws_url: str, token: str, connections: int, messages: int, concurrency: int
+) -> list[ScenarioResult]:
+    """Открывает соединения и замеряет время ответа на chat_message"""
+    connect_latencies: list[float] = []
+    roundtrip_latencies: list[float] = []
+    connect_errors = 0
+    message_errors = 0
+    handshake_limit = asyncio.Semaphore(concurrency)
+    sockets: list[Any] = []
+
+    async def connect() -> None:
+        nonlocal connect_errors
+        async with handshake_limit:
+            started = time.perf_counter()
+            try:
+                socket = await websockets.connect(
+                    f"{ws_url}/bench-{uuid.uuid4()}?token={token}"
+                )
+            except (OSError, websockets.WebSocketException):
+                connect_errors += 1
+                return
+            connect_latencies.append(time.perf_counter() - started)
+            sockets.append(socket)
+
+    async def exchange(socket: Any) -> None:
+        nonlocal message_errors
+        for index in range(messages):
+            started = time.perf_counter()
+            try:
+                await socket.send(
+                    json.dumps({"type": "chat_message", "message": str(index)})
+                )
+                await asyncio.wait_for(socket.recv(), timeout=10)
+            except (TimeoutError, websockets.WebSocketException):
+                message_errors += 1
+                continue
+            roundtrip_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect() for _ in range(connections)))
+    connect_duration = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(exchange(socket) for socket in sockets))
+    exchange_duration = time.perf_counter() - started
+
+    await asyncio.gather(
+        *(socket.close() for socket in sockets), return_exceptions=True
+    )
+
+    total_messages = len(sockets) * messages
+    return [
+        ScenarioResult(
+            name="websocket-connect",
+            requests=connections,
+            errors=connect_errors,
+            duration=round(connect_duration, 3),
+            rps=round(connections / connect_duration, 2),
+            latency_ms=summarize(connect_latencies),
+        ),
+        ScenarioResult(
+            name="websocket-roundtrip",
+            requests=total_messages,
+            errors=message_errors,
+            duration=round(exchange_duration, 3),
+            rps=round(total_messages / exchange_duration, 2)
+            if exchange_duration
+            else 0,
+            latency_ms=summarize(roundtrip_latencies),
+        ),
+    ]
+
+
+def read_process_memory(pid: int) -> dict[str, int]:
+    """Текущий и пиковый RSS процесса в килобайтах"""
+    memory: dict[str, int] = {}
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key in ("VmRSS", "VmHWM"):
+            memory[key] = int(value.split()[0])
+    return memory
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, Any], baseline_path: Path) -> None:
+    """Печатает изменение RPS и p99 относительно сохраненного прогона"""
+    baseline = json.loads(baseline_path.read_text())
+    previous = {item["name"]: item for item in baseline["scenarios"]}
+    print(f"\nСравнение с {baseline_path} ({baseline.get('git_commit')})")
+    for item in current["scenarios"]:
+        old = previous.get(item["name"])
+        if not old or not old["rps"] or not old["latency_ms"].get("p99"):
+            continue
+        rps_change = (item["rps"] - old["rps"]) / old["rps"] * 100
+        p99_change = (
+            (item["latency_ms"]["p99"] - old["latency_ms"]["p99"])
+            / old["latency_ms"]["p99"]
+            * 100
+        )
+        print(f"{item['name']:<24} rps {rps_change:+7.1f}%   p99 {p99_change:+7.1f}%")
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    api = f"{args.api_url.rstrip('/')}{args.api_prefix}"
+    scenarios: list[ScenarioResult] = []
+
+    async with httpx.AsyncClient(
+        timeout=30, limits=httpx.Limits(max_connections=args.concurrency)
+    ) as client:
+        credentials = {"username": args.username, "password": args.password}
+        response = await client.post(f"{api}/login/access-token", data=credentials)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        scenarios.append(
+            await run_http_scenario(
+                "login-access-token",
+                lambda _: client.post(f"{api}/login/access-token", data=credentials),
+                args.login_requests,
+                args.concurrency,
+            )
+        )
+        scenarios.append(
+            await run_http_scenario(
+                "users-me",
+                lambda _: client.get(f"{api}/users/me", headers=headers),
+                args.requests,
+                args.concurrency,
+            )
+        )
+        scenarios.append(
+            await run_http_scenario(
+                "users-list",
+                lambda index: client.get(
+                    f"{api}/users/",
+                    params={
+                        "skip": (index * args.page_size) % args.max_skip,
+                        "limit": args.page_size,
+                    },
+                    headers=headers,
+                ),
+                args.requests,
+                args.concurrency,
+            )
+        )
+        scenarios.append(
+            await run_http_scenario(
+                "websocket-broadcast",
+                lambda _: client.post(
+                    f"{api}/websocket/broadcast",
+                    json={"message": {"type": "benchmark", "content": {}}},
+                    headers=headers,
+                ),
+                args.requests,
+                args.concurrency,
+            )
+        )
+
+    if args.ws_url and args.ws_connections:
+        scenarios.extend(
+            await run_websocket_scenario(
+                args.ws_url.rstrip("/"),
+                token,
+                args.ws_connections,
+                args.ws_messages,
+                args.concurrency,
+            )
+        )
+
+    memory: dict[str, Any] = {
+        # ru_maxrss в Linux указывается в килобайтах
+        "benchmark": {"VmHWM": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    }
+    for item in args.pid:
+        name, _, pid = item.partition("=")
+        memory[name] = read_process_memory(int(pid))
+
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("password", "compare", "output")
+        },
+        "scenarios": [asdict(scenario) for scenario in scenarios],
+        "memory_kb": memory,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--api-prefix", default="/api/v1")
+    parser.add_argument("--ws-url", default="ws://localhost:8001")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--max-skip", type=int, default=1000)
+    parser.add_argument("--ws-connections", type=int, default=500)
+    parser.add_argument("--ws-messages", type=int, default=10)
+    parser.add_argument(
+        "--pid",
+        action="append",
+        default=[],
+        metavar="NAME=PID",
+        help="процесс сервера для замера памяти, можно указать несколько раз",
+    )
+    parser.add_argument("--output", type=Path, default=Path("benchmarks"))
+    parser.add_argument("--compare", type=Path)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    result = asyncio.run(run(args))
+
+    for item in result["scenarios"]:
+        latency = item["latency_ms"]
+        print(
+            f"{item['name']:<24} {item['rps']:>10.1f} rps  "
+            f"p50 {latency.get('p50', 0):>8.2f} ms  "
+            f"p99 {latency.get('p99', 0):>8.2f} ms  errors {item['errors']}"
+        )
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+    path = args.output / f"{stamp}-{result['git_commit'] or 'unknown'}.json"
+    path.write_text(json.dumps(result, indent=2))
+    print(f"\nРезультаты сохранены в {path}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Сравнение скорости рендеринга шаблонов писем.
+
+    python scripts/benchmark_email_templates.py --number 2000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from jinja2 import Template
+
+from app.utils.email import (
+    EMAIL_TEMPLATES_DIR,
+    render_email_template,
+    template_env,
+    warm_email_templates,
+)
+
+CONTEXT = {
+    "project_name": "Helpdesk",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "password": "changethis",
+    "valid_hours": 48,
+    "link": "http://localhost:5173/reset-password?token=token",
+}
+
+
+def render_from_file(template_name: str) -> str:
+    # Прежняя реализация: чтение файла и компиляция шаблона на каждый вызов
+    template_str = (EMAIL_TEMPLATES_DIR / template_name).read_text()
+    return Template(template_str).render(CONTEXT)
+
+
+def render_cached(template_name: str) -> str:
+    return render_email_template(template_name=template_name, context=CONTEXT)
+
+
+def measure(render: Callable[[str], str], template_name: str, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        render(template_name)
+    return number / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    template_env.cache.clear()  # type: ignore[union-attr]
+    start = time.perf_counter()
+    warm_email_templates()
+    print(f"Прогрев шаблонов: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'шаблон':<24} {'файл+компиляция':>16} {'кэш':>12} {'ускорение':>10}")
+    for template_name in template_env.list_templates(extensions=["html"]):
+        before = measure(render_from_file, template_name, args.number)
+        after = measure(render_cached, template_name, args.number)
+        print(
+            f"{template_name:<24} {before:>12.0f} r/s {after:>8.0f} r/s "
+            f"{after / before:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Подбор параметров хэширования паролей под целевое время проверки.
+
+    python scripts/benchmark_password_hash.py --target-ms 250
+    python scripts/benchmark_password_hash.py --scheme argon2 --target-ms 100
+
+Для каждой схемы выводится время проверки одного пароля, пропускная
+способность входа на одно ядро и самые стойкие параметры, укладывающиеся
+в целевое время.
+"""
+
+import argparse
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from app.core.security import build_pwd_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def measure_verify_ms(repeat: int, **params: Any) -> float:
+    context = build_pwd_context(**params)
+    hashed = context.hash(PASSWORD)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bcrypt_candidates() -> Iterator[dict[str, Any]]:
+    for rounds in range(10, 17):
+        yield {"scheme": "bcrypt", "bcrypt_rounds": rounds}
+
+
+def argon2_candidates(parallelism: int) -> Iterator[dict[str, Any]]:
+    # Рекомендации OWASP: не меньше 19 MiB памяти, стойкость растет с памятью
+    for memory_mib in (19, 32, 64, 128, 256):
+        for time_cost in (1, 2, 3, 4):
+            yield {
+                "scheme": "argon2",
+                "argon2_memory_cost": memory_mib * 1024,
+                "argon2_time_cost": time_cost,
+                "argon2_parallelism": parallelism,
+            }
+
+
+def strength(params: dict[str, Any]) -> int:
+    if params["scheme"] == "bcrypt":
+        return int(params["bcrypt_rounds"])
+    return int(params["argon2_memory_cost"] * params["argon2_time_cost"])
+
+
+def format_params(params: dict[str, Any]) -> str:
+    return " ".join(
+        f"PASSWORD_{'HASH_' if key == 'scheme' else ''}{key.upper()}={value}"
+        for key, value in params.items()
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scheme", choices=["bcrypt", "argon2"], action="append", default=None
+    )
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--argon2-parallelism", type=int, default=4)
+    args = parser.parse_args()
+
+    for scheme in args.scheme or ["bcrypt", "argon2"]:
+        candidates = (
+            bcrypt_candidates()
+            if scheme == "bcrypt"
+            else argon2_candidates(args.argon2_parallelism)
+        )
+        print(f"\n{scheme}")
+        chosen = None
+        for params in candidates:
+            verify_ms = measure_verify_ms(args.repeat, **params)
+            fits = verify_ms <= args.target_ms
+            print(
+                f"{format_params(params):<90} {verify_ms:>8.1f} ms "
+                f"{1000 / verify_ms:>7.1f} входов/с на ядро{'' if fits else ' *'}"
+            )
+            if fits and (chosen is None or strength(params) > strength(chosen)):
+                chosen = params
+            if not fits and scheme == "bcrypt":
+                # Время bcrypt удваивается с каждым раундом, дальше только медленнее
+                break
+        if chosen:
+            print(f"Рекомендуется: {format_params(chosen)}")
+        else:
+            print(f"Ни один вариант не укладывается в {args.target_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Сравнение способов сериализации ответа UsersPublic.
+
+    python scripts/benchmark_serialization.py --rows 100 1000
+"""
+
+import argparse
+import timeit
+import uuid
+from collections.abc import Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.schemas.user import UserPublic, UsersPublic
+
+
+def build_users(rows: int) -> UsersPublic:
+    return UsersPublic(
+        data=[
+            UserPublic(
+                id=uuid.uuid4(),
+                email=f"user{index}@example.com",
+                full_name=f"User {index}",
+                first_name="User",
+                last_name=str(index),
+            )
+            for index in range(rows)
+        ],
+        count=rows,
+    )
+
+
+def get_encoders(users: UsersPublic) -> dict[str, Callable[[], bytes]]:
+    json_response = JSONResponse.__new__(JSONResponse)
+    orjson_response = ORJSONResponse.__new__(ORJSONResponse)
+    return {
+        # Ответ без response_model: jsonable_encoder + json.dumps
+        "jsonable_encoder+json": lambda: json_response.render(jsonable_encoder(users)),
+        # Ответ с response_model: model_dump(mode="json") + рендер класса ответа
+        "model_dump+json": lambda: json_response.render(users.model_dump(mode="json")),
+        "model_dump+orjson": lambda: orjson_response.render(
+            users.model_dump(mode="json")
+        ),
+        # Кодирование напрямую в pydantic-core
+        "model_dump_json": lambda: users.model_dump_json().encode(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        users = build_users(rows)
+        encoders = get_encoders(users)
+        outputs = {len(encode()) for encode in encoders.values()}
+        print(f"\nUsersPublic, {rows} строк, размер ответа {sorted(outputs)} байт")
+        for name, encode in encoders.items():
+            number = max(1, 20000 // rows)
+            best = min(timeit.repeat(encode, number=number, repeat=args.repeat))
+            print(f"{name:<24} {best / number * 1000:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
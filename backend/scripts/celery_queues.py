@@ -0,0 +1,44 @@
+"""
+Число сообщений в очередях Celery, например для автомасштабирования воркеров.
+
+    python scripts/celery_queues.py
+    python scripts/celery_queues.py --queue email --json
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.core.celery_app import celery_app
+from app.core.celery_metrics import broker, get_queue_depths, get_unacked_count
+
+
+async def collect(queues: list[str]) -> tuple[dict[str, int], int]:
+    try:
+        return await get_queue_depths(queues), await get_unacked_count()
+    finally:
+        await broker.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--queue",
+        action="append",
+        help="очередь (можно несколько), по умолчанию все очереди приложения",
+    )
+    parser.add_argument("--json", action="store_true", help="вывод в JSON")
+    args = parser.parse_args()
+
+    queues = args.queue or [queue.name for queue in celery_app.conf.task_queues]
+    depths, unacked = asyncio.run(collect(queues))
+    if args.json:
+        print(json.dumps({"queues": depths, "unacked": unacked}))
+        return
+    for name, messages in depths.items():
+        print(f"{name:<16} {messages:>8}")
+    print(f"{'unacked':<16} {unacked:>8}")
+
+
+if __name__ == "__main__":
+    main()
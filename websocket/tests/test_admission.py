@@ -0,0 +1,31 @@
+from unittest import mock
+
+import websocket_server
+from websocket_server import WS_SHED_PUBLISH_LATENCY_MS, AdmissionControl
+
+
+def test_overload_recovers_without_new_publishes() -> None:
+    now = 1000.0
+    with mock.patch.object(websocket_server.time, "monotonic", lambda: now):
+        admission = AdmissionControl()
+        # Сбой Redis: несколько очень медленных публикаций подряд
+        for _ in range(10):
+            admission.record_publish(WS_SHED_PUBLISH_LATENCY_MS / 1000 * 10)
+        admission.last_probe = now
+        assert admission.overloaded()
+
+        # Публикаций больше нет, но оценка задержки затухает со временем
+        now += admission.LATENCY_HALF_LIFE * 10
+        assert not admission.overloaded()
+
+
+def test_recent_slow_publishes_keep_shedding() -> None:
+    now = 1000.0
+    with mock.patch.object(websocket_server.time, "monotonic", lambda: now):
+        admission = AdmissionControl()
+        for _ in range(10):
+            admission.record_publish(WS_SHED_PUBLISH_LATENCY_MS / 1000 * 10)
+        admission.last_probe = now
+
+        now += admission.PROBE_INTERVAL / 2
+        assert admission.overloaded()
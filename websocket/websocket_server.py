@@ -8,9 +8,34 @@ import logging
 from datetime import datetime
 from typing import Any
 import os
+import multiprocessing
+import signal
+import socket
+import tempfile
+import time
+import zlib
 import jwt
 from jwt.exceptions import InvalidTokenError
 from pydantic import BaseModel
+from fastapi.responses import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess,
+)
+import uvicorn
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+from websockets.frames import OP_BINARY, OP_TEXT, Frame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +48,79 @@ SECRET_KEY = os.getenv(
 )  # Должен быть тот же, что и в основном приложении
 ALGORITHM = "HS256"
 
+# Сжатие permessage-deflate: сообщения короче порога отправляются без сжатия
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+WS_COMPRESSION_MIN_SIZE = int(os.getenv("WS_COMPRESSION_MIN_SIZE", "512"))
+WS_COMPRESSION_LEVEL = int(os.getenv("WS_COMPRESSION_LEVEL", "6"))
+WS_COMPRESSION_MEM_LEVEL = int(os.getenv("WS_COMPRESSION_MEM_LEVEL", "5"))
+WS_COMPRESSION_WINDOW_BITS = int(os.getenv("WS_COMPRESSION_WINDOW_BITS", "12"))
+
+# Объединение исходящих сообщений в один кадр (0 - выключено)
+WS_BATCH_WINDOW_MS = int(os.getenv("WS_BATCH_WINDOW_MS", "0"))
+WS_BATCH_MAX_MESSAGES = int(os.getenv("WS_BATCH_MAX_MESSAGES", "50"))
+
+# Количество процессов-воркеров. Каждый воркер - отдельный сервер со своим
+# SERVER_ID, соединения распределяет ядро через SO_REUSEPORT
+WS_WORKERS = int(os.getenv("WS_WORKERS", "1"))
+
+# Ограничения входящего трафика
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "10000"))
+WS_MAX_FRAME_BYTES = int(os.getenv("WS_MAX_FRAME_BYTES", str(64 * 1024)))
+WS_CLIENT_RATE = float(os.getenv("WS_CLIENT_RATE", "20"))
+WS_CLIENT_BURST = float(os.getenv("WS_CLIENT_BURST", "40"))
+WS_USER_RATE = float(os.getenv("WS_USER_RATE", "50"))
+WS_USER_BURST = float(os.getenv("WS_USER_BURST", "100"))
+WS_MAX_RATE_VIOLATIONS = int(os.getenv("WS_MAX_RATE_VIOLATIONS", "50"))
+WS_SHED_PUBLISH_LATENCY_MS = float(os.getenv("WS_SHED_PUBLISH_LATENCY_MS", "200"))
+
+# Коды закрытия соединения (RFC 6455)
+WS_CLOSE_POLICY_VIOLATION = 1008
+WS_CLOSE_MESSAGE_TOO_BIG = 1009
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+# Количество шардов канала ответов (0 - единый канал websocket_responses).
+# Должно совпадать с настройкой основного приложения
+WEBSOCKET_RESPONSE_SHARDS = int(os.getenv("WEBSOCKET_RESPONSE_SHARDS", "256"))
+
+
+# Метрики Prometheus. Только агрегаты без меток по клиентам, чтобы стоимость
+# обновления и выгрузки не зависела от количества соединений
+disable_created_metrics()
+ACTIVE_CONNECTIONS = Gauge(
+    "websocket_active_connections",
+    "Active WebSocket connections",
+    multiprocess_mode="livesum",
+)
+CONNECTIONS = Counter("websocket_connections", "Accepted WebSocket connections")
+DISCONNECTIONS = Counter("websocket_disconnections", "Closed WebSocket connections")
+MESSAGES_RECEIVED = Counter("websocket_messages_received", "Messages from clients")
+BYTES_RECEIVED = Counter("websocket_received_bytes", "Bytes received from clients")
+MESSAGES_SENT = Counter("websocket_messages_sent", "Messages delivered to clients")
+BYTES_SENT = Counter("websocket_sent_bytes", "Bytes delivered to clients")
+SEND_QUEUE_DEPTH = Gauge(
+    "websocket_send_queue_depth",
+    "Messages waiting in batching send queues",
+    multiprocess_mode="livesum",
+)
+REDIS_PUBLISH_SECONDS = Histogram(
+    "websocket_redis_publish_seconds",
+    "Redis PUBLISH latency",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+PUBSUB_HANDLE_SECONDS = Histogram(
+    "websocket_pubsub_handle_seconds",
+    "Time to handle a message received from Redis pubsub",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+PUBSUB_LAG_SECONDS = Histogram(
+    "websocket_pubsub_lag_seconds",
+    "Delay between publishing a response and receiving it from Redis",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DROPPED_MESSAGES = Counter(
+    "websocket_dropped_messages", "Dropped messages and connections", ["reason"]
+)
+
 
 class TokenPayload(BaseModel):
     sub: str
@@ -33,12 +131,79 @@ async def decode_token(token: str) -> dict[str, Any] | None:
     """Декодирует и верифицирует JWT токен"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Refresh токены годятся только для обмена на новую пару токенов
+        if payload.get("type", "access") != "access":
+            return None
         return payload
     except InvalidTokenError as e:
         logger.error(f"Invalid token: {e}")
         return None
 
 
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate, который не сжимает короткие сообщения"""
+
+    def __init__(self, *args: Any, min_size: int = 0, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame: Frame) -> Frame:
+        # RFC 7692 разрешает отправлять часть сообщений без сжатия (RSV1 = 0),
+        # состояние компрессора при этом не меняется
+        if (
+            frame.opcode in (OP_TEXT, OP_BINARY)
+            and frame.fin
+            and len(frame.data) < self.min_size
+        ):
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    """Фабрика расширения permessage-deflate с порогом сжатия"""
+
+    def __init__(self, min_size: int = 0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(
+            params, accepted_extensions
+        )
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+class CompressingWebSocketProtocol(WebSocketProtocol):
+    """Протокол uvicorn с настраиваемым permessage-deflate"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        if self.config.ws_per_message_deflate:
+            self.available_extensions = [
+                ThresholdDeflateFactory(
+                    min_size=WS_COMPRESSION_MIN_SIZE,
+                    server_max_window_bits=WS_COMPRESSION_WINDOW_BITS,
+                    compress_settings={
+                        "level": WS_COMPRESSION_LEVEL,
+                        "memLevel": WS_COMPRESSION_MEM_LEVEL,
+                    },
+                )
+            ]
+
+    def fail_connection(self, code: int = 1006, reason: str = "") -> None:
+        # Сообщения больше ws_max_size протокол закрывает сам, приложение их не видит
+        if code == WS_CLOSE_MESSAGE_TOO_BIG:
+            admission.count_shed("frame_too_large")
+        super().fail_connection(code, reason)
+
+
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     # Startup
@@ -59,9 +224,96 @@ app = FastAPI(lifespan=lifespan)
 redis = Redis.from_url("redis://redis:6379")
 
 
+def get_response_channel(key: str) -> str:
+    """Возвращает шард канала ответов для client_id или user_id"""
+    if WEBSOCKET_RESPONSE_SHARDS <= 0:
+        return "websocket_responses"
+    shard = zlib.crc32(key.encode()) % WEBSOCKET_RESPONSE_SHARDS
+    return f"websocket_responses:{shard}"
+
+
+class ShardSubscriptions:
+    """Подписки только на те шарды, в которых есть локальные соединения"""
+
+    def __init__(self):
+        self.pubsub = redis.pubsub()
+        self.refcounts: dict[str, int] = {}
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, *keys: str) -> None:
+        async with self.lock:
+            for key in keys:
+                channel = get_response_channel(key)
+                count = self.refcounts.get(channel, 0)
+                if count == 0 and channel != "websocket_responses":
+                    await self.pubsub.subscribe(channel)
+                self.refcounts[channel] = count + 1
+
+    async def release(self, *keys: str) -> None:
+        async with self.lock:
+            for key in keys:
+                channel = get_response_channel(key)
+                count = self.refcounts.get(channel, 0) - 1
+                if count > 0:
+                    self.refcounts[channel] = count
+                    continue
+                self.refcounts.pop(channel, None)
+                if channel != "websocket_responses":
+                    await self.pubsub.unsubscribe(channel)
+
+
+shard_subscriptions = ShardSubscriptions()
+
+
+class BatchingSender:
+    """Очередь исходящих сообщений клиента, объединяющая их в один кадр"""
+
+    def __init__(self, websocket: WebSocket, window: float, max_messages: int):
+        self.websocket = websocket
+        self.window = window
+        self.max_messages = max_messages
+        self.queue: asyncio.Queue[str] = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    def send(self, message: str) -> None:
+        self.queue.put_nowait(message)
+        SEND_QUEUE_DEPTH.inc()
+
+    async def _run(self) -> None:
+        while True:
+            first = await self.queue.get()
+            # Глубина уменьшается сразу при извлечении: close() вычитает только
+            # то, что осталось в очереди, если задачу отменят во время ожидания
+            SEND_QUEUE_DEPTH.dec()
+            # Ждем, пока накопятся другие сообщения для этого клиента
+            await asyncio.sleep(self.window)
+            batch = [first]
+            while len(batch) < self.max_messages and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                SEND_QUEUE_DEPTH.dec()
+
+            if len(batch) == 1:
+                text = first
+            else:
+                # Сообщения уже сериализованы, склеиваем их без повторного разбора
+                text = '{"type": "batch", "messages": [' + ", ".join(batch) + "]}"
+            try:
+                await self.websocket.send_text(text)
+            except Exception as e:
+                logger.error(f"Error sending batch: {e}")
+                DROPPED_MESSAGES.labels("send_error").inc(len(batch))
+                break
+            BYTES_SENT.inc(len(text.encode()))
+
+    def close(self) -> None:
+        self.task.cancel()
+        SEND_QUEUE_DEPTH.dec(self.queue.qsize())
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: dict[str, WebSocket] = {}
+        self.batch_senders: dict[str, BatchingSender] = {}
         self.connection_metadata: dict[str, dict[str, str]] = {}
         self.user_connections: dict[
             str, list[str]
@@ -69,10 +321,28 @@ class ConnectionManager:
         self.server_id = SERVER_ID
 
     async def connect(
-        self, client_id: str, websocket: WebSocket, user_id: str | None = None
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        user_id: str | None = None,
+        batch: bool = False,
     ):
         await websocket.accept()
+        CONNECTIONS.inc()
+        # Новое соединение с тем же client_id заменяет прежнее в реестре
+        previous = self.active_connections.get(client_id)
         self.active_connections[client_id] = websocket
+        if previous is None:
+            ACTIVE_CONNECTIONS.inc()
+        sender = self.batch_senders.pop(client_id, None)
+        if sender:
+            sender.close()
+
+        # Клиент сам запрашивает пакетный режим, сервер должен его разрешать
+        if batch and WS_BATCH_WINDOW_MS > 0:
+            self.batch_senders[client_id] = BatchingSender(
+                websocket, WS_BATCH_WINDOW_MS / 1000, WS_BATCH_MAX_MESSAGES
+            )
 
         # Получаем IP и User-Agent безопасно
         client_host = getattr(websocket.client, "host", "unknown")
@@ -91,7 +361,8 @@ class ConnectionManager:
         if user_id:
             if user_id not in self.user_connections:
                 self.user_connections[user_id] = []
-            self.user_connections[user_id].append(client_id)
+            if client_id not in self.user_connections[user_id]:
+                self.user_connections[user_id].append(client_id)
 
         await self.update_session_info(client_id)
         logger.info(
@@ -99,8 +370,9 @@ class ConnectionManager:
             + (f" for user {user_id}" if user_id else "")
         )
 
-    async def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
+    async def disconnect(self, client_id: str, websocket: WebSocket):
+        # Соединение не было зарегистрировано или уже заменено новым
+        if self.active_connections.get(client_id) is websocket:
             # Если соединение принадлежало авторизованному пользователю,
             # удаляем его из user_connections
             user_id = self.connection_metadata.get(client_id, {}).get("user_id")
@@ -112,6 +384,11 @@ class ConnectionManager:
                     del self.user_connections[user_id]
 
             del self.active_connections[client_id]
+            DISCONNECTIONS.inc()
+            ACTIVE_CONNECTIONS.dec()
+            sender = self.batch_senders.pop(client_id, None)
+            if sender:
+                sender.close()
             if client_id in self.connection_metadata:
                 await redis.hdel("websocket_sessions", client_id)  # type: ignore
                 del self.connection_metadata[client_id]
@@ -119,7 +396,13 @@ class ConnectionManager:
 
     async def send_to_client(self, client_id: str, message: str) -> bool:
         if client_id in self.active_connections:
-            await self.active_connections[client_id].send_text(message)
+            sender = self.batch_senders.get(client_id)
+            MESSAGES_SENT.inc()
+            if sender:
+                sender.send(message)
+            else:
+                await self.active_connections[client_id].send_text(message)
+                BYTES_SENT.inc(len(message.encode()))
             # Обновляем время последней активности
             if client_id in self.connection_metadata:
                 self.connection_metadata[client_id]["last_activity"] = (
@@ -160,6 +443,143 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+class TokenBucket:
+    """Ограничитель частоты по алгоритму token bucket"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class AdmissionControl:
+    """Контроль допуска соединений и сообщений со сбросом нагрузки"""
+
+    # Пока Redis перегружен, пропускаем одну публикацию за интервал для замера
+    PROBE_INTERVAL = 0.1
+    LATENCY_SMOOTHING = 0.2
+    # Без новых замеров оценка задержки вдвое уменьшается за это время,
+    # иначе после сбоя Redis сервер отклонял бы трафик бесконечно: пока он
+    # сбрасывает нагрузку, публикаций и новых замеров может не быть
+    LATENCY_HALF_LIFE = 1.0
+
+    def __init__(self):
+        # Корзины и нарушения соединений ключуются самим соединением:
+        # client_id может быть одновременно у нескольких сокетов
+        self.client_buckets: dict[WebSocket, TokenBucket] = {}
+        self.user_buckets: dict[str, TokenBucket] = {}
+        self.violations: dict[WebSocket, int] = {}
+        self.publish_latency = 0.0
+        self.last_sample = time.monotonic()
+        self.last_probe = 0.0
+        # Копия счетчиков DROPPED_MESSAGES для /health
+        self.shed: dict[str, int] = {
+            "connection_limit": 0,
+            "overloaded_connect": 0,
+            "overloaded_message": 0,
+            "client_rate": 0,
+            "user_rate": 0,
+            "rate_limit_close": 0,
+            "frame_too_large": 0,
+        }
+
+    def count_shed(self, reason: str) -> None:
+        self.shed[reason] += 1
+        DROPPED_MESSAGES.labels(reason).inc()
+
+    def current_latency(self, now: float) -> float:
+        """Сглаженная задержка публикации с затуханием со времени замера"""
+        idle = max(0.0, now - self.last_sample)
+        return self.publish_latency * 0.5 ** (idle / self.LATENCY_HALF_LIFE)
+
+    def overloaded(self) -> bool:
+        now = time.monotonic()
+        if self.current_latency(now) * 1000 < WS_SHED_PUBLISH_LATENCY_MS:
+            return False
+        if now - self.last_probe >= self.PROBE_INTERVAL:
+            self.last_probe = now
+            return False
+        return True
+
+    def record_publish(self, seconds: float) -> None:
+        """Обновляет сглаженную задержку публикации в Redis"""
+        REDIS_PUBLISH_SECONDS.observe(seconds)
+        now = time.monotonic()
+        latency = self.current_latency(now)
+        self.publish_latency = latency + self.LATENCY_SMOOTHING * (seconds - latency)
+        self.last_sample = now
+
+    def admit_connection(self) -> bool:
+        if len(manager.active_connections) >= WS_MAX_CONNECTIONS:
+            self.count_shed("connection_limit")
+            return False
+        if self.overloaded():
+            self.count_shed("overloaded_connect")
+            return False
+        return True
+
+    def register(self, websocket: WebSocket, user_id: str | None) -> None:
+        self.client_buckets[websocket] = TokenBucket(WS_CLIENT_RATE, WS_CLIENT_BURST)
+        if user_id and user_id not in self.user_buckets:
+            self.user_buckets[user_id] = TokenBucket(WS_USER_RATE, WS_USER_BURST)
+
+    def unregister(self, websocket: WebSocket, user_id: str | None) -> None:
+        self.client_buckets.pop(websocket, None)
+        self.violations.pop(websocket, None)
+        # Корзина пользователя общая для всех его соединений на сервере
+        if user_id and user_id not in manager.user_connections:
+            self.user_buckets.pop(user_id, None)
+
+    def admit_message(self, websocket: WebSocket, user_id: str | None) -> str | None:
+        """Возвращает None, если сообщение принято, "drop" или "close" иначе"""
+        if self.overloaded():
+            self.count_shed("overloaded_message")
+            return "drop"
+
+        client_bucket = self.client_buckets.get(websocket)
+        if client_bucket is None:
+            client_bucket = self.client_buckets[websocket] = TokenBucket(
+                WS_CLIENT_RATE, WS_CLIENT_BURST
+            )
+        user_bucket = self.user_buckets.get(user_id) if user_id else None
+        if user_id and user_bucket is None:
+            # Корзину могло удалить отключение другого соединения пользователя
+            user_bucket = self.user_buckets[user_id] = TokenBucket(
+                WS_USER_RATE, WS_USER_BURST
+            )
+
+        if not client_bucket.consume():
+            reason = "client_rate"
+        elif user_bucket and not user_bucket.consume():
+            reason = "user_rate"
+        else:
+            self.violations.pop(websocket, None)
+            return None
+
+        self.count_shed(reason)
+        violations = self.violations.get(websocket, 0) + 1
+        self.violations[websocket] = violations
+        if violations >= WS_MAX_RATE_VIOLATIONS:
+            self.count_shed("rate_limit_close")
+            return "close"
+        return "drop"
+
+
+admission = AdmissionControl()
+
+
 async def register_server() -> bool:
     """Регистрирует этот сервер в Redis"""
     server_info = {
@@ -221,17 +641,23 @@ async def update_active_sessions() -> None:
 
 async def redis_subscriber() -> None:
     """Слушаем ответы от основного приложения"""
-    pubsub = redis.pubsub()
+    # Шарды каналов ответов подписываются по мере подключения клиентов
+    pubsub = shard_subscriptions.pubsub
+    server_channel = f"websocket_server_{SERVER_ID}"
     await pubsub.subscribe("websocket_responses")
-    await pubsub.subscribe(f"websocket_server_{SERVER_ID}")
+    await pubsub.subscribe(server_channel)
 
     async for message in pubsub.listen():
         if message["type"] == "message":
+            started = time.perf_counter()
             try:
                 # В асинхронном Redis данные приходят в bytes
                 data_bytes = message["data"]
                 if isinstance(data_bytes, bytes):
                     data = json.loads(data_bytes.decode())
+                    published_at = data.get("published_at")
+                    if published_at:
+                        PUBSUB_LAG_SECONDS.observe(max(time.time() - published_at, 0))
                     client_id = data.get("client_id")
                     user_id = data.get("user_id")
                     response = data.get("response")
@@ -258,6 +684,10 @@ async def redis_subscriber() -> None:
                         success = await manager.send_to_client(
                             client_id, json.dumps(response)
                         )
+                        # В шардах бывают чужие клиенты, потерей считаем только
+                        # адресованные этому серверу сообщения
+                        if not success and message["channel"] == server_channel.encode():
+                            DROPPED_MESSAGES.labels("client_not_found").inc()
                         if not success and data.get("broadcast_if_missing", False):
                             # Клиент не найден на этом сервере - оповестим другие серверы
                             await redis.publish(
@@ -283,11 +713,15 @@ async def redis_subscriber() -> None:
             except (json.JSONDecodeError, AttributeError) as e:
                 logger.error(f"Error processing message: {e}")
                 continue
+            PUBSUB_HANDLE_SECONDS.observe(time.perf_counter() - started)
 
 
 @app.websocket("/{client_id}")
 async def websocket_endpoint(
-    websocket: WebSocket, client_id: str, token: str | None = Query(None)
+    websocket: WebSocket,
+    client_id: str,
+    token: str | None = Query(None),
+    batch: bool = Query(False),
 ):
     user_id = None
 
@@ -299,12 +733,52 @@ async def websocket_endpoint(
             # Записываем информацию о юзере в логи
             logger.info(f"Authenticated connection for user {user_id}")
 
+    if not admission.admit_connection():
+        # Принимаем соединение только для того, чтобы клиент получил код закрытия
+        await websocket.accept()
+        await websocket.close(
+            code=WS_CLOSE_TRY_AGAIN_LATER, reason="Server is overloaded"
+        )
+        return
+
+    # Подписываемся на шарды до accept, чтобы не потерять первые ответы.
+    # Подписка учитывается на каждое соединение и снимается при любом выходе
+    shard_keys = (client_id, *([user_id] if user_id else []))
+    await shard_subscriptions.acquire(*shard_keys)
+    try:
+        await handle_connection(websocket, client_id, user_id, batch)
+    finally:
+        await shard_subscriptions.release(*shard_keys)
+
+
+async def handle_connection(
+    websocket: WebSocket, client_id: str, user_id: str | None, batch: bool
+) -> None:
     # Принимаем соединение в любом случае, но с информацией о пользователе, если он авторизован
-    await manager.connect(client_id, websocket, user_id)
+    try:
+        await manager.connect(client_id, websocket, user_id, batch)
+    except Exception:
+        await manager.disconnect(client_id, websocket)
+        raise
+    admission.register(websocket, user_id)
 
     try:
         while True:
+            # Сообщения больше WS_MAX_FRAME_BYTES отклоняет протокол с кодом 1009
             data = await websocket.receive_text()
+
+            decision = admission.admit_message(websocket, user_id)
+            if decision == "drop":
+                continue
+            if decision == "close":
+                await websocket.close(
+                    code=WS_CLOSE_POLICY_VIOLATION, reason="Rate limit exceeded"
+                )
+                break
+
+            MESSAGES_RECEIVED.inc()
+            BYTES_RECEIVED.inc(len(data.encode()))
+
             # Отправляем событие в Redis для обработки основным приложением
             event_data = {
                 "client_id": client_id,
@@ -317,22 +791,39 @@ async def websocket_endpoint(
             if user_id:
                 event_data["user_id"] = user_id
 
+            started = time.perf_counter()
             await redis.publish("websocket_events", json.dumps(event_data))
+            admission.record_publish(time.perf_counter() - started)
     except WebSocketDisconnect:
-        await manager.disconnect(client_id)
-        # Уведомляем основное приложение об отключении клиента
-        disconnect_data = {
-            "client_id": client_id,
-            "event_type": "disconnect",
-            "server_id": SERVER_ID,
-            "timestamp": datetime.now().isoformat(),
-        }
+        pass
+    finally:
+        await manager.disconnect(client_id, websocket)
+        admission.unregister(websocket, user_id)
+    # Уведомляем основное приложение об отключении клиента
+    disconnect_data = {
+        "client_id": client_id,
+        "event_type": "disconnect",
+        "server_id": SERVER_ID,
+        "timestamp": datetime.now().isoformat(),
+    }
 
-        # Добавляем информацию о пользователе, если он был авторизован
-        if user_id:
-            disconnect_data["user_id"] = user_id
+    # Добавляем информацию о пользователе, если он был авторизован
+    if user_id:
+        disconnect_data["user_id"] = user_id
+
+    await redis.publish("websocket_events", json.dumps(disconnect_data))
 
-        await redis.publish("websocket_events", json.dumps(disconnect_data))
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Метрики в формате Prometheus"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # В режиме нескольких воркеров собираем метрики всех процессов
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health")
@@ -343,4 +834,91 @@ async def health_check():
         "server_id": SERVER_ID,
         "active_connections": len(manager.active_connections),
         "authorized_users": len(manager.user_connections),
+        "publish_latency_ms": round(
+            admission.current_latency(time.monotonic()) * 1000, 2
+        ),
+        "shed": admission.shed,
     }
+
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    """Создает слушающий сокет, который можно разделить между процессами"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def get_uvicorn_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        ws=CompressingWebSocketProtocol,
+        ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE,
+        ws_max_size=WS_MAX_FRAME_BYTES,
+    )
+
+
+def run_worker() -> None:
+    """Запускает воркер на собственном сокете с SO_REUSEPORT"""
+    config = get_uvicorn_config()
+    server = uvicorn.Server(config)
+    server.run(sockets=[create_reuseport_socket(config.host, config.port)])
+
+
+def run_workers(count: int) -> None:
+    """Запускает воркеры и перезапускает упавшие до получения сигнала остановки"""
+    # Каталог для метрик воркеров должен быть задан до их запуска
+    os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="websocket_metrics_")
+    )
+    # spawn: каждый воркер заново импортирует модуль и получает свой SERVER_ID
+    context = multiprocessing.get_context("spawn")
+    workers: list[multiprocessing.process.BaseProcess] = []
+    stopping = False
+
+    def stop(_signum: int, _frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(count):
+        worker = context.Process(target=run_worker)
+        worker.start()
+        workers.append(worker)
+    logger.info(f"Started {count} WebSocket workers")
+
+    while not stopping:
+        for index, worker in enumerate(workers):
+            if not worker.is_alive() and not stopping:
+                logger.error(
+                    f"Worker {worker.pid} exited with code {worker.exitcode}, restarting"
+                )
+                multiprocess.mark_process_dead(worker.pid)
+                workers[index] = context.Process(target=run_worker)
+                workers[index].start()
+        time.sleep(1)
+
+    # Воркеры сами корректно завершаются по SIGTERM и снимают регистрацию в Redis
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.join(timeout=30)
+        if worker.is_alive():
+            worker.kill()
+
+
+def main() -> None:
+    """Запускает uvicorn с настроенным сжатием WebSocket"""
+    if WS_WORKERS > 1:
+        run_workers(WS_WORKERS)
+    else:
+        uvicorn.Server(get_uvicorn_config()).run()
+
+
+if __name__ == "__main__":
+    main()